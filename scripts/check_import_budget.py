@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Import-time budget check for the embeddings CLI.
+
+Runs each entry point in a fresh interpreter, times it, and verifies that
+heavy optional dependencies (openai, scikit-learn, python-dotenv, httpx)
+were not imported. Exits non-zero if any check is over budget or pulls in
+a heavy module, so it can gate CI:
+
+    python scripts/check_import_budget.py
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+IMPORT_BUDGET_SECONDS = 1.0  # Per entry point, measured inside the interpreter
+HEAVY_MODULES = ("openai", "sklearn", "dotenv", "httpx")
+
+# Name -> code run in a fresh interpreter (cwd = scripts/)
+CHECKS = {
+    "import embeddings.client": "import embeddings.client",
+    "import run_embedding_analysis": "import run_embedding_analysis",
+    "run_embedding_analysis.py --help": (
+        "import runpy\n"
+        "sys.argv = ['run_embedding_analysis.py', '--help']\n"
+        "try:\n"
+        "    runpy.run_path('run_embedding_analysis.py', run_name='__main__')\n"
+        "except SystemExit:\n"
+        "    pass\n"
+    )
+}
+
+_HARNESS = """
+import contextlib, io, json, sys, time
+start = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+{body}
+elapsed = time.perf_counter() - start
+heavy = sorted(name for name in {heavy!r} if name in sys.modules)
+print(json.dumps({{"seconds": elapsed, "heavy_modules": heavy}}))
+"""
+
+
+def run_check(code: str, scripts_dir: Path) -> dict:
+    """
+    Run one entry point in a fresh interpreter.
+
+    Args:
+        code: Python source to time
+        scripts_dir: Working directory (so ``embeddings`` is importable)
+
+    Returns:
+        Dictionary with 'seconds' and 'heavy_modules'
+    """
+    body = "\n".join("    " + line for line in code.splitlines())
+    source = _HARNESS.format(body=body, heavy=HEAVY_MODULES)
+    completed = subprocess.run(
+        [sys.executable, "-c", source],
+        cwd=scripts_dir,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check embeddings CLI import time")
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=IMPORT_BUDGET_SECONDS,
+        help=f"Seconds allowed per entry point (default: {IMPORT_BUDGET_SECONDS})"
+    )
+    args = parser.parse_args()
+
+    scripts_dir = Path(__file__).parent
+    failed = False
+    for name, code in CHECKS.items():
+        result = run_check(code, scripts_dir)
+        problems = []
+        if result["seconds"] > args.budget:
+            problems.append(f"over budget ({args.budget:.2f}s)")
+        if result["heavy_modules"]:
+            problems.append(f"imported {', '.join(result['heavy_modules'])}")
+        status = "FAIL" if problems else "ok"
+        print(f"  {status:4} {name}: {result['seconds']:.3f}s" + (f" - {'; '.join(problems)}" if problems else ""))
+        failed = failed or bool(problems)
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    exit(main())
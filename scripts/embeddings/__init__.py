@@ -16,7 +16,7 @@ Usage:
     from embeddings.models import ContentEmbedding, KeywordEmbedding
     from embeddings.analysis import cluster_keywords, assess_completeness
 
-    # Initialize client
+    # Initialize client (or EmbeddingClient(backend=HashingBackend()) offline)
     client = EmbeddingClient()
 
     # Generate embeddings
@@ -26,27 +26,68 @@ Usage:
     clusters = cluster_keywords(keyword_embeddings)
 """
 
-from .client import EmbeddingClient
-from .cache import EmbeddingCache
-from .models import (
-    EmbeddingResult,
-    ContentEmbedding,
-    KeywordEmbedding,
-    ClusterResult,
-    CompletenessResult,
-    AnswerDensityResult,
-    EntityCoverageResult,
-    CitationOpportunity,
-    CitationResult,
-    RAGChunkResult,
-    AnalysisResult
-)
+import importlib
+
+# Exported name -> submodule. Submodules are imported on first attribute
+# access, so ``import embeddings.models`` or a CLI's --help stays fast.
+_EXPORTS = {
+    "EmbeddingClient": "client",
+    "EmbeddingBatchError": "client",
+    "EmbeddingBackend": "backends",
+    "OpenAIBackend": "backends",
+    "HashingBackend": "backends",
+    "LocalBackend": "backends",
+    "create_backend": "backends",
+    "EmbeddingCache": "cache",
+    "VectorStore": "vector_store",
+    "SimilarityIndex": "similarity",
+    "MetricsRegistry": "metrics",
+    "REGISTRY": "metrics",
+    "configure_transport": "transport",
+    "EmbeddingResult": "models",
+    "EmbeddingFailure": "models",
+    "ContentEmbedding": "models",
+    "KeywordEmbedding": "models",
+    "ClusterResult": "models",
+    "CompletenessResult": "models",
+    "AnswerDensityResult": "models",
+    "EntityCoverageResult": "models",
+    "CitationOpportunity": "models",
+    "CitationResult": "models",
+    "RAGChunkResult": "models",
+    "AnalysisResult": "models"
+}
+
+
+def __getattr__(name: str):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
 
 __version__ = "1.0.0"
 __all__ = [
     "EmbeddingClient",
+    "EmbeddingBatchError",
+    "EmbeddingBackend",
+    "OpenAIBackend",
+    "HashingBackend",
+    "LocalBackend",
+    "create_backend",
     "EmbeddingCache",
+    "VectorStore",
+    "SimilarityIndex",
+    "MetricsRegistry",
+    "REGISTRY",
+    "configure_transport",
     "EmbeddingResult",
+    "EmbeddingFailure",
     "ContentEmbedding",
     "KeywordEmbedding",
     "ClusterResult",
@@ -10,12 +10,36 @@ This package provides various analysis tools including:
 - RAG chunk optimization
 """
 
-from .clustering import cluster_keywords, find_related_keywords
-from .completeness import assess_completeness, find_content_gaps
-from .answer_density import analyze_answer_density, find_answerable_sections
-from .entities import analyze_entity_coverage, suggest_missing_entities
-from .citations import find_citation_worthy, score_citation_potential
-from .rag import analyze_rag_chunks, optimize_chunk_boundaries
+import importlib
+
+# Exported name -> submodule; submodules are imported on first attribute access
+_EXPORTS = {
+    "cluster_keywords": "clustering",
+    "find_related_keywords": "clustering",
+    "assess_completeness": "completeness",
+    "find_content_gaps": "completeness",
+    "analyze_answer_density": "answer_density",
+    "find_answerable_sections": "answer_density",
+    "analyze_entity_coverage": "entities",
+    "suggest_missing_entities": "entities",
+    "find_citation_worthy": "citations",
+    "score_citation_potential": "citations",
+    "analyze_rag_chunks": "rag",
+    "optimize_chunk_boundaries": "rag"
+}
+
+
+def __getattr__(name: str):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
 
 __all__ = [
     "cluster_keywords",
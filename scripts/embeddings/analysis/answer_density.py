@@ -8,8 +8,8 @@ sections that are optimized for AI/LLM citation.
 import re
 import numpy as np
 from typing import Optional
-from sklearn.metrics.pairwise import cosine_similarity
 
+from ..similarity import pairwise_cosine_similarity
 from ..models import ContentEmbedding, AnswerDensityResult
 
 
@@ -49,7 +49,7 @@ def analyze_answer_density(
 
     for question, q_vec in question_embeddings.items():
         q_vec = np.array(q_vec).reshape(1, -1)
-        similarity = float(cosine_similarity(content_vec, q_vec)[0][0])
+        similarity = float(pairwise_cosine_similarity(content_vec, q_vec)[0][0])
         question_scores[question] = similarity
 
         if similarity >= answer_threshold:
@@ -206,7 +206,7 @@ def score_section_answerability(
 
     for question, q_vec in question_embeddings.items():
         q_vec = np.array(q_vec).reshape(1, -1)
-        similarity = float(cosine_similarity(section_vec, q_vec)[0][0])
+        similarity = float(pairwise_cosine_similarity(section_vec, q_vec)[0][0])
 
         if similarity > best_score:
             best_score = similarity
@@ -266,7 +266,7 @@ def identify_question_gaps(
 
         for question, q_vec in question_embeddings.items():
             q_vec = np.array(q_vec).reshape(1, -1)
-            similarity = float(cosine_similarity(content_vec, q_vec)[0][0])
+            similarity = float(pairwise_cosine_similarity(content_vec, q_vec)[0][0])
 
             if similarity >= coverage_threshold:
                 question_coverage[question].append({
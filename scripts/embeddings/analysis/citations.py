@@ -8,7 +8,6 @@ AI systems and LLMs, supporting Generative Engine Optimization (GEO).
 import re
 import numpy as np
 from typing import Optional
-from sklearn.metrics.pairwise import cosine_similarity
 
 from ..models import ContentEmbedding, CitationOpportunity, CitationResult
 
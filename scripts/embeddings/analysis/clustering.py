@@ -7,9 +7,8 @@ their semantic similarity via embeddings.
 
 import numpy as np
 from typing import Optional
-from sklearn.cluster import AgglomerativeClustering, KMeans
-from sklearn.metrics.pairwise import cosine_similarity
 
+from ..similarity import pairwise_cosine_similarity
 from ..models import KeywordEmbedding, ClusterResult
 
 
@@ -46,6 +45,9 @@ def cluster_keywords(
     embeddings_matrix = np.array([ke.embedding for ke in keyword_embeddings])
     keywords = [ke.keyword for ke in keyword_embeddings]
 
+    # scikit-learn takes seconds to import, so load it only when clustering runs
+    from sklearn.cluster import AgglomerativeClustering, KMeans
+
     # Perform clustering
     if method == "hierarchical":
         if n_clusters is None:
@@ -87,13 +89,13 @@ def cluster_keywords(
         centroid = np.mean(cluster_embeddings, axis=0)
 
         # Find keyword closest to centroid
-        similarities_to_centroid = cosine_similarity([centroid], cluster_embeddings)[0]
+        similarities_to_centroid = pairwise_cosine_similarity([centroid], cluster_embeddings)[0]
         centroid_idx = np.argmax(similarities_to_centroid)
         centroid_keyword = cluster_keywords[centroid_idx]
 
         # Calculate average intra-cluster similarity
         if len(cluster_embeddings) > 1:
-            sim_matrix = cosine_similarity(cluster_embeddings)
+            sim_matrix = pairwise_cosine_similarity(cluster_embeddings)
             # Get upper triangle (excluding diagonal)
             upper_tri = sim_matrix[np.triu_indices(len(cluster_embeddings), k=1)]
             avg_similarity = float(np.mean(upper_tri))
@@ -143,7 +145,7 @@ def find_related_keywords(
             continue
 
         kw_embedding = np.array(kw.embedding)
-        similarity = float(cosine_similarity([target_embedding], [kw_embedding])[0][0])
+        similarity = float(pairwise_cosine_similarity([target_embedding], [kw_embedding])[0][0])
 
         if similarity >= min_similarity:
             results.append((kw.keyword, similarity))
@@ -206,7 +208,7 @@ def compute_similarity_matrix(
     embeddings_matrix = np.array([ke.embedding for ke in keyword_embeddings])
     keywords = [ke.keyword for ke in keyword_embeddings]
 
-    similarity_matrix = cosine_similarity(embeddings_matrix)
+    similarity_matrix = pairwise_cosine_similarity(embeddings_matrix)
 
     return similarity_matrix, keywords
 
@@ -7,8 +7,8 @@ by comparing content embeddings against topic benchmarks.
 
 import numpy as np
 from typing import Optional
-from sklearn.metrics.pairwise import cosine_similarity
 
+from ..similarity import pairwise_cosine_similarity
 from ..models import ContentEmbedding, CompletenessResult
 
 
@@ -46,7 +46,7 @@ def assess_completeness(
 
     for topic_name, topic_vec in topic_embeddings.items():
         topic_vec = np.array(topic_vec).reshape(1, -1)
-        similarity = float(cosine_similarity(content_vec, topic_vec)[0][0])
+        similarity = float(pairwise_cosine_similarity(content_vec, topic_vec)[0][0])
         topic_coverage[topic_name] = round(similarity, 4)
 
         if similarity >= similarity_threshold:
@@ -114,7 +114,7 @@ def find_content_gaps(
     gaps = []
     for topic_name, topic_vec in expected_topic_embeddings.items():
         topic_vec = np.array(topic_vec).reshape(1, -1)
-        similarity = float(cosine_similarity(content_vec, topic_vec)[0][0])
+        similarity = float(pairwise_cosine_similarity(content_vec, topic_vec)[0][0])
 
         if similarity < gap_threshold:
             gaps.append((topic_name, similarity))
@@ -147,7 +147,7 @@ def compare_content_coverage(
 
         for topic_name, topic_vec in topic_embeddings.items():
             topic_vec = np.array(topic_vec).reshape(1, -1)
-            similarity = float(cosine_similarity(content_vec, topic_vec)[0][0])
+            similarity = float(pairwise_cosine_similarity(content_vec, topic_vec)[0][0])
             coverage[topic_name] = round(similarity, 4)
 
         coverage_matrix[content.url] = coverage
@@ -176,7 +176,7 @@ def find_best_content_for_topic(
 
     for content in content_embeddings:
         content_vec = np.array(content.embedding).reshape(1, -1)
-        similarity = float(cosine_similarity(content_vec, topic_vec)[0][0])
+        similarity = float(pairwise_cosine_similarity(content_vec, topic_vec)[0][0])
         results.append((content.url, similarity))
 
     results.sort(key=lambda x: x[1], reverse=True)
@@ -206,7 +206,7 @@ def calculate_topic_distribution(
 
         for topic_name, topic_vec in topic_embeddings.items():
             topic_vec = np.array(topic_vec).reshape(1, -1)
-            similarity = float(cosine_similarity(content_vec, topic_vec)[0][0])
+            similarity = float(pairwise_cosine_similarity(content_vec, topic_vec)[0][0])
 
             if similarity >= coverage_threshold:
                 topic_counts[topic_name] += 1
@@ -235,7 +235,7 @@ def identify_content_redundancy(
 
         for j, content2 in enumerate(content_embeddings[i+1:], start=i+1):
             vec2 = np.array(content2.embedding).reshape(1, -1)
-            similarity = float(cosine_similarity(vec1, vec2)[0][0])
+            similarity = float(pairwise_cosine_similarity(vec1, vec2)[0][0])
 
             if similarity >= similarity_threshold:
                 redundant_pairs.append((content1.url, content2.url, similarity))
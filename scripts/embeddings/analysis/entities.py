@@ -7,8 +7,8 @@ domain, including organizations, treatments, medications, and concepts.
 
 import numpy as np
 from typing import Optional
-from sklearn.metrics.pairwise import cosine_similarity
 
+from ..similarity import pairwise_cosine_similarity
 from ..models import ContentEmbedding, EntityCoverageResult
 
 
@@ -50,7 +50,7 @@ def analyze_entity_coverage(
 
         for entity_name, entity_vec in entities.items():
             entity_vec = np.array(entity_vec).reshape(1, -1)
-            similarity = float(cosine_similarity(content_vec, entity_vec)[0][0])
+            similarity = float(pairwise_cosine_similarity(content_vec, entity_vec)[0][0])
             category_scores.append(similarity)
             all_scores.append(similarity)
 
@@ -104,7 +104,7 @@ def suggest_missing_entities(
     for category, entities in entity_embeddings.items():
         for entity_name, entity_vec in entities.items():
             entity_vec = np.array(entity_vec).reshape(1, -1)
-            similarity = float(cosine_similarity(content_vec, entity_vec)[0][0])
+            similarity = float(pairwise_cosine_similarity(content_vec, entity_vec)[0][0])
 
             # Look for entities that are somewhat related but not fully covered
             if 0.3 <= similarity < coverage_threshold:
@@ -148,7 +148,7 @@ def compare_entity_coverage(
             scores = []
             for entity_name, entity_vec in entities.items():
                 entity_vec = np.array(entity_vec).reshape(1, -1)
-                similarity = float(cosine_similarity(content_vec, entity_vec)[0][0])
+                similarity = float(pairwise_cosine_similarity(content_vec, entity_vec)[0][0])
                 scores.append(similarity)
 
             coverage[category] = round(np.mean(scores), 4) if scores else 0.0
@@ -179,7 +179,7 @@ def find_content_for_entity(
 
     for content in content_embeddings:
         content_vec = np.array(content.embedding).reshape(1, -1)
-        similarity = float(cosine_similarity(content_vec, entity_vec)[0][0])
+        similarity = float(pairwise_cosine_similarity(content_vec, entity_vec)[0][0])
         results.append((content.url, similarity))
 
     results.sort(key=lambda x: x[1], reverse=True)
@@ -226,7 +226,7 @@ def calculate_entity_authority_score(
 
             for entity_name, entity_vec in entities.items():
                 entity_vec = np.array(entity_vec).reshape(1, -1)
-                similarity = float(cosine_similarity(content_vec, entity_vec)[0][0])
+                similarity = float(pairwise_cosine_similarity(content_vec, entity_vec)[0][0])
                 weighted_scores.append(similarity * weight)
 
         if weighted_scores:
@@ -264,7 +264,7 @@ def identify_entity_gaps_sitewide(
 
             for content in content_embeddings:
                 content_vec = np.array(content.embedding).reshape(1, -1)
-                similarity = float(cosine_similarity(content_vec, entity_vec)[0][0])
+                similarity = float(pairwise_cosine_similarity(content_vec, entity_vec)[0][0])
                 max_coverage = max(max_coverage, similarity)
 
             if max_coverage < min_coverage_threshold:
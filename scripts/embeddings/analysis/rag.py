@@ -8,8 +8,8 @@ in RAG systems used by AI search engines.
 import re
 import numpy as np
 from typing import Optional
-from sklearn.metrics.pairwise import cosine_similarity
 
+from ..similarity import pairwise_cosine_similarity
 from ..models import ContentEmbedding, RAGChunkResult
 
 
@@ -137,7 +137,7 @@ def analyze_rag_chunks(
 
         for query, q_emb in query_embeddings.items():
             q_vec = np.array(q_emb).reshape(1, -1)
-            similarity = float(cosine_similarity(chunk_vec, q_vec)[0][0])
+            similarity = float(pairwise_cosine_similarity(chunk_vec, q_vec)[0][0])
             query_scores[query] = round(similarity, 4)
 
         best_query = max(query_scores.items(), key=lambda x: x[1])
@@ -251,7 +251,7 @@ def simulate_retrieval(
 
     for content in content_embeddings:
         content_vec = np.array(content.embedding).reshape(1, -1)
-        similarity = float(cosine_similarity(content_vec, query_vec)[0][0])
+        similarity = float(pairwise_cosine_similarity(content_vec, query_vec)[0][0])
         results.append((content.url, similarity))
 
     results.sort(key=lambda x: x[1], reverse=True)
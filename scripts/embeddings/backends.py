@@ -0,0 +1,561 @@
+"""
+Embedding backends behind EmbeddingClient.
+
+A backend turns one batch of texts into vectors and classifies its own
+errors. Caching, batching, retries, coalescing and usage accounting stay in
+the client, so every backend gets them for free.
+
+Backends:
+    OpenAIBackend   OpenAI embeddings API (rate limited, needs an API key)
+    HashingBackend  Deterministic offline feature-hashing projection, for
+                    benchmarks, air-gapped CI and profiling without a key
+    LocalBackend    In-process CPU inference from a local ONNX or
+                    sentence-transformers model directory
+"""
+
+import asyncio
+import base64
+import hashlib
+import importlib
+import os
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, AsyncContextManager, Optional, Protocol, Sequence, Union
+
+import numpy as np
+
+from .cache import EMBEDDING_DTYPE
+from .rate_limit import RateLimiter, get_rate_limiter
+from .tokens import count_tokens_batch
+from .transport import create_async_http_client, get_http_client
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+
+def decode_embedding(data: Union[str, list[float]]) -> np.ndarray:
+    """
+    Decode an API embedding into a float32 array.
+
+    Base64 payloads (``encoding_format="base64"``) are little-endian float32
+    bytes and become a read-only ``np.frombuffer`` view without creating a
+    Python float per value; float lists are converted as a fallback.
+    """
+    if isinstance(data, str):
+        return np.frombuffer(base64.b64decode(data), dtype=EMBEDDING_DTYPE)
+    return np.asarray(data, dtype=EMBEDDING_DTYPE)
+
+
+@dataclass
+class BackendResponse:
+    """Vectors for one batch, in input order, plus the tokens it consumed."""
+
+    embeddings: list[Union[list[float], np.ndarray]]
+    total_tokens: int
+    rate_limit_wait: float = 0.0  # Seconds the request was held back before sending
+
+
+class EmbeddingBackend(Protocol):
+    """Interface EmbeddingClient uses to embed batches of texts."""
+
+    name: str
+    default_model: str
+    default_dimensions: int
+    price_per_token: float  # USD, for usage cost estimates
+
+    def embed(self, texts: list[str], model: str, dimensions: int) -> BackendResponse:
+        """Embed one batch synchronously."""
+        ...
+
+    def async_session(self) -> AsyncContextManager[Any]:
+        """Open per-event-loop resources (e.g. an async HTTP client) for ``aembed``."""
+        ...
+
+    async def aembed(self, session: Any, texts: list[str], model: str, dimensions: int) -> BackendResponse:
+        """Embed one batch inside an ``async_session``."""
+        ...
+
+    def is_retryable(self, error: Exception) -> bool:
+        """Whether the error is transient and the same batch may be retried."""
+        ...
+
+    def is_invalid_input(self, error: Exception) -> bool:
+        """Whether some text in the batch was rejected (the batch gets bisected)."""
+        ...
+
+    def close(self) -> None:
+        """Release backend resources."""
+        ...
+
+
+class OpenAIBackend:
+    """OpenAI embeddings API under the shared rate limiter and pooled HTTP transport."""
+
+    name = "openai"
+    default_model = "text-embedding-3-large"
+    default_dimensions = 3072
+    price_per_token = 0.00000013  # text-embedding-3-large pricing
+    REQUESTS_PER_MINUTE = 3000  # Default request budget (adjusted from response headers)
+    TOKENS_PER_MINUTE = 1000000  # Default token budget (adjusted from response headers)
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None
+    ):
+        """
+        Initialize the OpenAI backend.
+
+        Args:
+            api_key: OpenAI API key. If None, reads from OPENAI_API_KEY env var
+            requests_per_minute: Initial request budget for the shared rate limiter
+            tokens_per_minute: Initial token budget for the shared rate limiter
+        """
+        # Get API key from environment (or a .env file) if not provided
+        if api_key is None:
+            from dotenv import load_dotenv
+            load_dotenv()
+            api_key = os.getenv("OPENAI_API_KEY")
+            if api_key is None:
+                # Try loading from .env file
+                env_path = Path(__file__).parent.parent.parent / ".env"
+                if env_path.exists():
+                    with open(env_path) as f:
+                        for line in f:
+                            if line.startswith("OPENAI_API_KEY="):
+                                api_key = line.split("=", 1)[1].strip().strip('"\'')
+                                break
+
+        if api_key is None:
+            raise ValueError(
+                "OpenAI API key not found. Set OPENAI_API_KEY environment variable "
+                "or pass api_key parameter."
+            )
+
+        self._api_key = api_key
+        self._client = None
+        self._http_client = None
+        self._client_lock = threading.Lock()
+        self.requests_per_minute = requests_per_minute or self.REQUESTS_PER_MINUTE
+        self.tokens_per_minute = tokens_per_minute or self.TOKENS_PER_MINUTE
+
+    @property
+    def client(self):
+        """
+        OpenAI SDK client on the process-wide pooled transport.
+
+        Rebuilt whenever the shared transport changes (after a fork or
+        ``configure_transport``), so it never uses a stale connection pool.
+        """
+        http_client = get_http_client()
+        if self._http_client is not http_client:
+            # The openai SDK takes most of a second to import, so load it on first use
+            from openai import OpenAI
+
+            with self._client_lock:
+                if self._http_client is not http_client:
+                    # Retries are handled by the client (with bisection), not inside the SDK
+                    self._client = OpenAI(api_key=self._api_key, max_retries=0, http_client=http_client)
+                    self._http_client = http_client
+        return self._client
+
+    def rate_limiter(self, model: str) -> RateLimiter:
+        """One limiter per model, shared by every client and thread in the process."""
+        return get_rate_limiter(model, self.requests_per_minute, self.tokens_per_minute)
+
+    @staticmethod
+    def _to_response(response, rate_limit_wait: float) -> BackendResponse:
+        return BackendResponse(
+            embeddings=[decode_embedding(item.embedding) for item in response.data],
+            total_tokens=response.usage.total_tokens,
+            rate_limit_wait=rate_limit_wait
+        )
+
+    def embed(self, texts: list[str], model: str, dimensions: int) -> BackendResponse:
+        """Call the embeddings API for one batch under the shared rate limiter."""
+        from openai import RateLimitError
+
+        limiter = self.rate_limiter(model)
+        wait = limiter.acquire(sum(count_tokens_batch(texts)))
+        try:
+            raw = self.client.embeddings.with_raw_response.create(
+                input=texts,
+                model=model,
+                dimensions=dimensions,
+                encoding_format="base64"
+            )
+        except RateLimitError as e:
+            limiter.penalize(e.response.headers)
+            raise
+        limiter.update_from_headers(raw.headers)
+        return self._to_response(raw.parse(), wait)
+
+    @asynccontextmanager
+    async def async_session(self):
+        # The async HTTP client is bound to the running event loop, so each
+        # session gets its own pool with the shared transport settings
+        from openai import AsyncOpenAI
+
+        async with AsyncOpenAI(
+            api_key=self._api_key,
+            max_retries=0,
+            http_client=create_async_http_client()
+        ) as async_client:
+            yield async_client
+
+    async def aembed(
+        self,
+        session: "AsyncOpenAI",
+        texts: list[str],
+        model: str,
+        dimensions: int
+    ) -> BackendResponse:
+        """Asyncio variant of ``embed``."""
+        from openai import RateLimitError
+
+        limiter = self.rate_limiter(model)
+        wait = await limiter.acquire_async(sum(count_tokens_batch(texts)))
+        try:
+            raw = await session.embeddings.with_raw_response.create(
+                input=texts,
+                model=model,
+                dimensions=dimensions,
+                encoding_format="base64"
+            )
+        except RateLimitError as e:
+            limiter.penalize(e.response.headers)
+            raise
+        limiter.update_from_headers(raw.headers)
+        return self._to_response(raw.parse(), wait)
+
+    def is_retryable(self, error: Exception) -> bool:
+        from openai import APIConnectionError, InternalServerError, RateLimitError
+
+        # APIConnectionError covers timeouts; InternalServerError covers 5xx
+        return isinstance(error, (RateLimitError, APIConnectionError, InternalServerError))
+
+    def is_invalid_input(self, error: Exception) -> bool:
+        from openai import BadRequestError
+
+        return isinstance(error, BadRequestError)
+
+    def close(self) -> None:
+        # The pooled transport is shared with other backends (closed at exit)
+        self._client = None
+        self._http_client = None
+
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+class HashingBackend:
+    """
+    Deterministic offline embeddings via a seeded feature-hashing projection.
+
+    Word unigrams and bigrams are hashed into signed buckets of the requested
+    dimension and the result is L2-normalized, so texts sharing vocabulary
+    land near each other and the same (text, seed, dimensions) always gives
+    the same vector. Optional latency simulation mimics API round trips.
+    """
+
+    name = "hashing"
+    default_model = "hashing-v1"
+    default_dimensions = 3072
+    price_per_token = 0.0
+    BIGRAM_WEIGHT = 0.5  # Bigram features relative to unigrams
+
+    def __init__(
+        self,
+        seed: int = 0,
+        latency: float = 0.0,
+        latency_per_1k_tokens: float = 0.0,
+        jitter: float = 0.2
+    ):
+        """
+        Initialize the hashing backend.
+
+        Args:
+            seed: Hash seed; different seeds give unrelated vector spaces
+            latency: Simulated seconds per request (0 = full speed)
+            latency_per_1k_tokens: Additional simulated seconds per 1k tokens
+            jitter: Relative random spread applied to the simulated latency
+        """
+        if latency < 0 or latency_per_1k_tokens < 0:
+            raise ValueError("Simulated latency must be non-negative")
+
+        self.seed = seed
+        self.latency = latency
+        self.latency_per_1k_tokens = latency_per_1k_tokens
+        self.jitter = jitter
+        self._key = seed.to_bytes(8, "little", signed=True)
+
+    def _features(self, text: str) -> tuple[Sequence[str], Sequence[float]]:
+        words = _WORD_PATTERN.findall(text.lower())
+        bigrams = [f"{a} {b}" for a, b in zip(words, words[1:])]
+        weights = [1.0] * len(words) + [self.BIGRAM_WEIGHT] * len(bigrams)
+        return words + bigrams, weights
+
+    def embed_text(self, text: str, dimensions: int) -> np.ndarray:
+        """Project one text to a unit-length float32 vector."""
+        features, weights = self._features(text)
+        if not features:
+            # Texts without word characters still get a stable, distinct vector
+            features, weights = [text], [1.0]
+
+        indices = np.empty(len(features), dtype=np.int64)
+        signs = np.empty(len(features), dtype=np.float32)
+        for i, feature in enumerate(features):
+            digest = int.from_bytes(
+                hashlib.blake2b(feature.encode(), digest_size=8, key=self._key).digest(),
+                "little"
+            )
+            indices[i] = (digest >> 1) % dimensions
+            signs[i] = 1.0 if digest & 1 else -1.0
+
+        vector = np.zeros(dimensions, dtype=np.float32)
+        np.add.at(vector, indices, signs * np.asarray(weights, dtype=np.float32))
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            vector[indices[0]] = 1.0
+            norm = 1.0
+        return vector / norm
+
+    def _delay(self, tokens: int) -> float:
+        delay = self.latency + self.latency_per_1k_tokens * tokens / 1000
+        if delay and self.jitter:
+            delay *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        return max(0.0, delay)
+
+    def embed(self, texts: list[str], model: str, dimensions: int) -> BackendResponse:
+        """Embed one batch, sleeping for the simulated latency first."""
+        total_tokens = sum(count_tokens_batch(texts))
+        delay = self._delay(total_tokens)
+        if delay:
+            time.sleep(delay)
+        return BackendResponse(
+            embeddings=[self.embed_text(text, dimensions) for text in texts],
+            total_tokens=total_tokens
+        )
+
+    @asynccontextmanager
+    async def async_session(self):
+        yield None
+
+    async def aembed(self, session: Any, texts: list[str], model: str, dimensions: int) -> BackendResponse:
+        """Asyncio variant of ``embed``."""
+        total_tokens = sum(count_tokens_batch(texts))
+        delay = self._delay(total_tokens)
+        if delay:
+            await asyncio.sleep(delay)
+        return BackendResponse(
+            embeddings=[self.embed_text(text, dimensions) for text in texts],
+            total_tokens=total_tokens
+        )
+
+    def is_retryable(self, error: Exception) -> bool:
+        return False
+
+    def is_invalid_input(self, error: Exception) -> bool:
+        return False
+
+    def close(self) -> None:
+        pass
+
+
+def _optional_import(module: str, package: str):
+    """Import an optional dependency of the local backend."""
+    try:
+        return importlib.import_module(module)
+    except ImportError as e:
+        raise ImportError(
+            f"The local embedding backend requires {package}: pip install {package}"
+        ) from e
+
+
+class _SentenceTransformerEncoder:
+    """Encoder for a sentence-transformers model directory."""
+
+    def __init__(self, model_dir: Path):
+        sentence_transformers = _optional_import("sentence_transformers", "sentence-transformers")
+        self.model = sentence_transformers.SentenceTransformer(str(model_dir), device="cpu")
+        self.dimensions = self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts: list[str]) -> tuple[np.ndarray, int]:
+        vectors = self.model.encode(
+            texts,
+            batch_size=len(texts),
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        )
+        return vectors.astype(np.float32, copy=False), sum(count_tokens_batch(texts))
+
+
+class _OnnxEncoder:
+    """Encoder for an exported ONNX transformer with a tokenizer.json (mean pooling)."""
+
+    MAX_SEQUENCE_LENGTH = 512  # Tokens per text; longer texts are truncated
+
+    def __init__(self, model_path: Path, tokenizer_path: Path, intra_op_threads: int):
+        onnxruntime = _optional_import("onnxruntime", "onnxruntime")
+        tokenizers = _optional_import("tokenizers", "tokenizers")
+
+        options = onnxruntime.SessionOptions()
+        # Parallelism comes from the backend's thread pool, one op thread per batch
+        options.intra_op_num_threads = intra_op_threads
+        self.session = onnxruntime.InferenceSession(
+            str(model_path), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+        self.tokenizer = tokenizers.Tokenizer.from_file(str(tokenizer_path))
+        self.tokenizer.enable_truncation(max_length=self.MAX_SEQUENCE_LENGTH)
+        self.tokenizer.enable_padding()
+
+        self.dimensions = self.session.get_outputs()[0].shape[-1]
+        if not isinstance(self.dimensions, int):
+            self.dimensions = self.encode(["dimension probe"])[0].shape[1]
+
+    def encode(self, texts: list[str]) -> tuple[np.ndarray, int]:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+
+        hidden = self.session.run(None, {k: v for k, v in feeds.items() if k in self.input_names})[0]
+        if hidden.ndim == 3:
+            # Mean-pool token states over the attention mask
+            mask = attention_mask[:, :, None].astype(np.float32)
+            hidden = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+
+        vectors = hidden.astype(np.float32, copy=False)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        return vectors, int(attention_mask.sum())
+
+
+class LocalBackend:
+    """
+    In-process CPU embeddings from a local model directory.
+
+    The directory holds either an ONNX export (``model.onnx`` or
+    ``onnx/model.onnx`` next to ``tokenizer.json``) or a sentence-transformers
+    model. Each batch is split into sub-batches encoded in parallel on a
+    thread pool (both runtimes release the GIL during inference). Vectors are
+    cached under the model name ``local:<directory name>``.
+    """
+
+    name = "local"
+    price_per_token = 0.0
+    BATCH_SIZE = 64  # Texts per forward pass
+
+    def __init__(
+        self,
+        model_dir: str,
+        num_threads: Optional[int] = None,
+        batch_size: Optional[int] = None
+    ):
+        """
+        Load a local embedding model.
+
+        Args:
+            model_dir: Directory containing the ONNX or sentence-transformers model
+            num_threads: Worker threads encoding sub-batches (defaults to CPU count)
+            batch_size: Texts per forward pass (defaults to BATCH_SIZE)
+        """
+        self.model_dir = Path(model_dir)
+        if not self.model_dir.is_dir():
+            raise ValueError(f"Local model directory not found: {model_dir}")
+
+        self.num_threads = num_threads or os.cpu_count() or 1
+        self.batch_size = batch_size or self.BATCH_SIZE
+        self.default_model = f"local:{self.model_dir.name}"
+
+        onnx_path = next(
+            (p for p in (self.model_dir / "model.onnx", self.model_dir / "onnx" / "model.onnx") if p.exists()),
+            None
+        )
+        if onnx_path is not None:
+            self.encoder = _OnnxEncoder(onnx_path, self.model_dir / "tokenizer.json", intra_op_threads=1)
+        else:
+            self.encoder = _SentenceTransformerEncoder(self.model_dir)
+        self.default_dimensions = self.encoder.dimensions
+
+        self._executor = ThreadPoolExecutor(self.num_threads, thread_name_prefix="local-embed")
+        self._executor_lock = threading.Lock()
+
+    def embed(self, texts: list[str], model: str, dimensions: int) -> BackendResponse:
+        """Encode one batch as parallel sub-batches on the thread pool."""
+        if dimensions > self.default_dimensions:
+            raise ValueError(
+                f"{self.default_model} produces {self.default_dimensions}-dimensional "
+                f"vectors; {dimensions} requested"
+            )
+
+        with self._executor_lock:
+            futures = [
+                self._executor.submit(self.encoder.encode, texts[i:i + self.batch_size])
+                for i in range(0, len(texts), self.batch_size)
+            ]
+
+        embeddings, total_tokens = [], 0
+        for future in futures:
+            vectors, tokens = future.result()
+            total_tokens += tokens
+            if dimensions < self.default_dimensions:
+                # Truncate and re-normalize, as the API does for shorter vectors
+                vectors = vectors[:, :dimensions]
+                vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+            embeddings.extend(vectors)
+        return BackendResponse(embeddings=embeddings, total_tokens=total_tokens)
+
+    @asynccontextmanager
+    async def async_session(self):
+        yield None
+
+    async def aembed(self, session: Any, texts: list[str], model: str, dimensions: int) -> BackendResponse:
+        """Asyncio variant of ``embed`` (waits for the pool off the event loop)."""
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self.embed, texts, model, dimensions
+        )
+
+    def is_retryable(self, error: Exception) -> bool:
+        return False
+
+    def is_invalid_input(self, error: Exception) -> bool:
+        return False
+
+    def close(self) -> None:
+        with self._executor_lock:
+            self._executor.shutdown(wait=True)
+
+
+BACKENDS = {
+    "openai": OpenAIBackend,
+    "hashing": HashingBackend,
+    "local": LocalBackend
+}
+
+
+def create_backend(name: str, **kwargs) -> EmbeddingBackend:
+    """
+    Create a backend by name.
+
+    Args:
+        name: One of BACKENDS
+        **kwargs: Passed to the backend constructor
+
+    Returns:
+        The backend instance
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend: {name} (choose from {', '.join(BACKENDS)})")
+    return BACKENDS[name](**kwargs)
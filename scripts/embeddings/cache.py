@@ -3,107 +3,634 @@ SQLite-based embedding cache.
 
 Stores embeddings by content hash to avoid re-embedding unchanged content.
 Provides significant cost savings (~$0.00002/1K tokens).
+
+Vectors are stored as raw little-endian float32 BLOBs (see ``EMBEDDING_DTYPE``)
+and handed back as NumPy views over the row buffer, so reads never round-trip
+through JSON or Python float lists.
+
+Each thread keeps one long-lived connection to a WAL-mode database, so
+several runners (threads or processes) can share one cache file without
+"database is locked" errors. Cache hits are counted in memory and flushed
+as one batched UPDATE, so reads do not take the write lock.
+
+A bounded in-process LRU tier sits in front of SQLite, so repeated lookups
+of the same (model, dimensions, content_hash) never reach disk. An optional
+on-disk size budget evicts least recently (or least frequently) used rows
+in small background transactions.
+
+Source text is optional: lookups are keyed by hash and results carry the
+caller's own text, so the stored copy can be compressed or dropped
+(``text_storage``) and is only inflated by ``get_text``.
+
+Statistics come from a small per-model counters table that triggers keep
+in step with every insert, delete and access flush, so ``get_stats`` is
+O(1); ``get_stats(verify=True)`` recomputes them with a full scan.
 """
 
+import os
 import sqlite3
 import json
 import hashlib
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import replace
 from pathlib import Path
 from datetime import datetime
-from typing import Optional
+from typing import Collection, Iterator, Optional
+
+import numpy as np
 
+from .metrics import REGISTRY, MetricsRegistry
 from .models import EmbeddingResult
 
+# On-disk vector format and schema version (tracked in PRAGMA user_version)
+EMBEDDING_DTYPE = "<f4"
+SCHEMA_VERSION = 4
+MIGRATION_CHUNK_SIZE = 500  # Rows converted per UPDATE batch during migration
+LOOKUP_CHUNK_SIZE = 500  # Hashes per IN (...) query, well under SQLite's variable limit
+
+# How source text is stored alongside each vector
+TEXT_STORAGE_MODES = ("full", "zlib", "zstd", "none")
+
+# Models whose embeddings can be shortened by truncation + re-normalization
+MATRYOSHKA_MODEL_PREFIXES = ("text-embedding-3-",)
+
+# Connection tuning
+BUSY_TIMEOUT_MS = 30000  # Wait this long for another writer before failing
+MMAP_SIZE = 256 * 1024 * 1024  # Memory-map up to 256 MB of the database file
+
+# Deferred access tracking
+ACCESS_FLUSH_THRESHOLD = 1000  # Pending hit records that trigger a flush
+ACCESS_FLUSH_INTERVAL = 30.0  # Seconds between automatic flushes
+
+# In-process memory tier
+DEFAULT_MEMORY_BYTES = 256 * 1024 * 1024  # ~21k vectors at 3072 dims
+
+# Size-budget eviction
+EVICTION_POLICIES = ("lru", "lfu")
+EVICTION_CHUNK_ROWS = 200  # Rows deleted per eviction transaction
+RECLAIM_CHUNK_PAGES = 1000  # Pages released per incremental_vacuum step
+
+
+def pack_embedding(embedding) -> bytes:
+    """Pack an embedding vector into a little-endian float32 BLOB."""
+    return np.asarray(embedding, dtype=EMBEDDING_DTYPE).tobytes()
+
+
+def unpack_embedding(blob: bytes, dtype: str = EMBEDDING_DTYPE) -> np.ndarray:
+    """Return a read-only NumPy view over a packed embedding BLOB."""
+    return np.frombuffer(blob, dtype=dtype)
+
+
+def truncate_embedding(embedding: np.ndarray, dimensions: int) -> np.ndarray:
+    """
+    Shorten a Matryoshka embedding to its first ``dimensions`` values.
+
+    The result is re-normalized to unit length, which matches what the API
+    returns when asked for fewer dimensions of a text-embedding-3 model.
+    """
+    truncated = np.array(embedding[:dimensions], dtype=EMBEDDING_DTYPE)
+    norm = np.linalg.norm(truncated)
+    if norm > 0:
+        truncated /= norm
+    truncated.setflags(write=False)
+    return truncated
+
+
+def _zstd():
+    """Import the optional zstandard package."""
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError(
+            "text_storage='zstd' requires the zstandard package: pip install zstandard"
+        ) from e
+    return zstandard
+
+
+def encode_text(text: str, mode: str) -> tuple:
+    """
+    Encode source text for storage.
+
+    Returns:
+        (stored value, codec name) where codec is 'plain', 'zlib', 'zstd' or 'none'
+    """
+    if mode == "zlib":
+        return zlib.compress(text.encode()), "zlib"
+    if mode == "zstd":
+        return _zstd().ZstdCompressor().compress(text.encode()), "zstd"
+    if mode == "none":
+        return "", "none"
+    return text, "plain"
+
+
+def decode_text(value, codec: str) -> Optional[str]:
+    """Inflate stored source text. Returns None if the text was not kept."""
+    if codec == "zlib":
+        return zlib.decompress(value).decode()
+    if codec == "zstd":
+        return _zstd().ZstdDecompressor().decompress(value).decode()
+    if codec == "none":
+        return None
+    return value
+
+
+def supports_truncation(model: str) -> bool:
+    """Return True if ``model`` produces Matryoshka (truncatable) embeddings."""
+    return model.startswith(MATRYOSHKA_MODEL_PREFIXES)
+
+
+class _MemoryTier:
+    """
+    Thread-safe LRU of EmbeddingResults bounded by total vector bytes.
+
+    Each entry also remembers the dimensions of the stored row it came from,
+    so hits on truncated vectors are credited to that row.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple, tuple[EmbeddingResult, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Optional[tuple[EmbeddingResult, int]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: tuple, result: EmbeddingResult, source_dimensions: Optional[int] = None) -> None:
+        if self.max_bytes <= 0:
+            return
+
+        # Keep a read-only float32 copy so sizes are exact and callers can't mutate it
+        vector = np.asarray(result.embedding, dtype=EMBEDDING_DTYPE)
+        if vector.flags.writeable:
+            vector = vector.copy()
+            vector.setflags(write=False)
+        if vector.nbytes > self.max_bytes:
+            return
+        result = replace(result, embedding=vector)
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= previous[0].embedding.nbytes
+            self._entries[key] = (result, source_dimensions or result.dimensions)
+            self.current_bytes += vector.nbytes
+            while self.current_bytes > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted.embedding.nbytes
+
+    def clear(self, model: Optional[str] = None) -> None:
+        with self._lock:
+            if model is None:
+                self._entries.clear()
+                self.current_bytes = 0
+                return
+            for key in [k for k in self._entries if k[0] == model]:
+                self.current_bytes -= self._entries.pop(key)[0].embedding.nbytes
+
+    def discard(self, rows: set[tuple[str, int, str]]) -> None:
+        """Drop entries served from the given (model, stored dimensions, content_hash) rows."""
+        if not rows:
+            return
+        with self._lock:
+            stale = [
+                key for key, (_, source_dimensions) in self._entries.items()
+                if (key[0], source_dimensions, key[2]) in rows
+            ]
+            for key in stale:
+                self.current_bytes -= self._entries.pop(key)[0].embedding.nbytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
 
 class EmbeddingCache:
-    """SQLite-based cache for embeddings."""
+    """SQLite-based cache for embeddings with an in-memory LRU tier."""
 
-    def __init__(self, db_path: Optional[str] = None):
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        track_access: bool = True,
+        memory_bytes: int = DEFAULT_MEMORY_BYTES,
+        max_size_mb: Optional[float] = None,
+        eviction_policy: str = "lru",
+        text_storage: str = "full",
+        metrics: Optional[MetricsRegistry] = None
+    ):
         """
         Initialize the embedding cache.
 
         Args:
             db_path: Path to SQLite database. Defaults to 'output/embedding_cache.db'
+            track_access: Whether to record hits in accessed_at/access_count.
+                Disable for read-only analysis runs.
+            memory_bytes: Byte budget for the in-process LRU tier (0 disables it)
+            max_size_mb: On-disk size budget. When exceeded, rows are evicted
+                in the background until the cache fits again.
+            eviction_policy: 'lru' (oldest accessed_at first) or 'lfu'
+                (lowest access_count first)
+            text_storage: How to keep source text: 'full', 'zlib', 'zstd'
+                (compressed) or 'none' (dropped)
+            metrics: Registry for lookup/write latency (defaults to the
+                process-wide registry)
         """
+        if text_storage not in TEXT_STORAGE_MODES:
+            raise ValueError(
+                f"Unknown text storage mode '{text_storage}'. "
+                f"Expected one of: {', '.join(TEXT_STORAGE_MODES)}"
+            )
+        if text_storage == "zstd":
+            _zstd()
+        if eviction_policy not in EVICTION_POLICIES:
+            raise ValueError(
+                f"Unknown eviction policy '{eviction_policy}'. "
+                f"Expected one of: {', '.join(EVICTION_POLICIES)}"
+            )
+
         if db_path is None:
             output_dir = Path(__file__).parent.parent.parent / "output"
             output_dir.mkdir(exist_ok=True)
             db_path = str(output_dir / "embedding_cache.db")
 
         self.db_path = db_path
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._pid = os.getpid()
+
+        self.track_access = track_access
+        self._pending_access: dict[tuple[str, str, int], tuple[int, str]] = {}
+        self._pending_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+        self._memory = _MemoryTier(memory_bytes)
+        self._disk_hits = 0
+        self._disk_misses = 0
+        self._truncated_hits = 0
+
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024) if max_size_mb else None
+        self.eviction_policy = eviction_policy
+        self.text_storage = text_storage
+        self._maintenance_thread: Optional[threading.Thread] = None
+        self._maintenance_lock = threading.Lock()
+
+        self.metrics = metrics or REGISTRY
+        self._lookup_seconds = self.metrics.histogram(
+            "embedding_cache_lookup_seconds", "Cache batch lookup latency in seconds"
+        )
+        self._write_seconds = self.metrics.histogram(
+            "embedding_cache_write_seconds", "Cache batch write latency in seconds"
+        )
+
         self._init_db()
 
+    def __enter__(self) -> "EmbeddingCache":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Return the calling thread's connection, opening it on first use.
+
+        Connections inherited across a fork are abandoned (not closed) so the
+        child never touches the parent's SQLite handles.
+        """
+        if self._pid != os.getpid():
+            self._local = threading.local()
+            self._connections = []
+            self._connections_lock = threading.Lock()
+            self._pid = os.getpid()
+
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.db_path,
+                timeout=BUSY_TIMEOUT_MS / 1000,
+                check_same_thread=False
+            )
+            conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+            # Only takes effect on a new database; lets eviction hand pages back
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+            conn.execute("PRAGMA temp_store = MEMORY")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def close(self) -> None:
+        """Flush pending access tracking and close every connection opened by this cache."""
+        if self._maintenance_thread is not None:
+            self._maintenance_thread.join()
+        self.flush_access()
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
     def _init_db(self):
-        """Initialize the database schema."""
-        with sqlite3.connect(self.db_path) as conn:
+        """Initialize the database schema, migrating older caches in place."""
+        with self._connect() as conn:
             cursor = conn.cursor()
             cursor.execute("""
-                CREATE TABLE IF NOT EXISTS embeddings (
-                    content_hash TEXT PRIMARY KEY,
-                    text TEXT NOT NULL,
-                    embedding TEXT NOT NULL,
-                    model TEXT NOT NULL,
-                    dimensions INTEGER NOT NULL,
-                    token_count INTEGER,
-                    created_at TEXT NOT NULL,
-                    accessed_at TEXT NOT NULL,
-                    access_count INTEGER DEFAULT 1
-                )
-            """)
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_model ON embeddings(model)
+                SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'embeddings'
             """)
+            exists = cursor.fetchone() is not None
+
+            migrated = False
+            version = SCHEMA_VERSION
+            if not exists:
+                self._create_table(cursor, "embeddings")
+            else:
+                cursor.execute("PRAGMA user_version")
+                version = cursor.fetchone()[0]
+                if version < 1:
+                    self._migrate_to_binary(conn)
+                if version < 2:
+                    self._migrate_to_composite_key(conn)
+                if version < 3:
+                    self._add_text_codec_column(conn)
+                migrated = version < 2
+
+            self._create_indexes(cursor)
+            self._create_stats_table(cursor)
+            if exists and version < 4:
+                self._rebuild_stats(cursor)
+            cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            conn.commit()
+
+            if migrated:
+                # Reclaim the space freed by rewritten rows (this also switches
+                # older files to auto_vacuum=INCREMENTAL)
+                conn.execute("VACUUM")
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    @staticmethod
+    def _create_table(cursor: sqlite3.Cursor, name: str) -> None:
+        """Create an embeddings table with the current schema."""
+        cursor.execute(f"""
+            CREATE TABLE {name} (
+                content_hash TEXT NOT NULL,
+                text TEXT NOT NULL,
+                text_codec TEXT NOT NULL DEFAULT 'plain',
+                embedding BLOB NOT NULL,
+                dtype TEXT NOT NULL DEFAULT '{EMBEDDING_DTYPE}',
+                model TEXT NOT NULL,
+                dimensions INTEGER NOT NULL,
+                token_count INTEGER,
+                created_at TEXT NOT NULL,
+                accessed_at TEXT NOT NULL,
+                access_count INTEGER DEFAULT 1,
+                PRIMARY KEY (content_hash, model, dimensions)
+            )
+        """)
+
+    @staticmethod
+    def _create_indexes(cursor: sqlite3.Cursor) -> None:
+        """Create secondary indexes used by stats, pruning and eviction."""
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_model ON embeddings(model)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_created_at ON embeddings(created_at)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_accessed_at ON embeddings(accessed_at)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_access_count ON embeddings(access_count, accessed_at)
+        """)
+
+    @staticmethod
+    def _create_stats_table(cursor: sqlite3.Cursor) -> None:
+        """Create the per-model counters table and the triggers that maintain it."""
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS cache_stats (
+                model TEXT PRIMARY KEY,
+                embeddings INTEGER NOT NULL DEFAULT 0,
+                tokens INTEGER NOT NULL DEFAULT 0,
+                accesses INTEGER NOT NULL DEFAULT 0,
+                text_bytes INTEGER NOT NULL DEFAULT 0,
+                vector_bytes INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_stats_insert AFTER INSERT ON embeddings
+            BEGIN
+                INSERT INTO cache_stats (model) VALUES (NEW.model) ON CONFLICT (model) DO NOTHING;
+                UPDATE cache_stats SET
+                    embeddings = embeddings + 1,
+                    tokens = tokens + COALESCE(NEW.token_count, 0),
+                    accesses = accesses + COALESCE(NEW.access_count, 0),
+                    text_bytes = text_bytes + length(CAST(NEW.text AS BLOB)),
+                    vector_bytes = vector_bytes + length(NEW.embedding)
+                WHERE model = NEW.model;
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_stats_delete AFTER DELETE ON embeddings
+            BEGIN
+                UPDATE cache_stats SET
+                    embeddings = embeddings - 1,
+                    tokens = tokens - COALESCE(OLD.token_count, 0),
+                    accesses = accesses - COALESCE(OLD.access_count, 0),
+                    text_bytes = text_bytes - length(CAST(OLD.text AS BLOB)),
+                    vector_bytes = vector_bytes - length(OLD.embedding)
+                WHERE model = OLD.model;
+            END
+        """)
+        # Access flushes only touch access_count, so keep that trigger cheap
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_stats_access AFTER UPDATE OF access_count ON embeddings
+            BEGIN
+                UPDATE cache_stats SET
+                    accesses = accesses + COALESCE(NEW.access_count, 0) - COALESCE(OLD.access_count, 0)
+                WHERE model = NEW.model;
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_stats_update AFTER UPDATE OF text, embedding, token_count ON embeddings
+            BEGIN
+                UPDATE cache_stats SET
+                    tokens = tokens + COALESCE(NEW.token_count, 0) - COALESCE(OLD.token_count, 0),
+                    text_bytes = text_bytes + length(CAST(NEW.text AS BLOB)) - length(CAST(OLD.text AS BLOB)),
+                    vector_bytes = vector_bytes + length(NEW.embedding) - length(OLD.embedding)
+                WHERE model = NEW.model;
+            END
+        """)
+
+    @staticmethod
+    def _rebuild_stats(cursor: sqlite3.Cursor) -> None:
+        """Recompute the counters table from a full scan of the embeddings table."""
+        cursor.execute("DELETE FROM cache_stats")
+        cursor.execute("""
+            INSERT INTO cache_stats (model, embeddings, tokens, accesses, text_bytes, vector_bytes)
+            SELECT
+                model,
+                COUNT(*),
+                COALESCE(SUM(token_count), 0),
+                COALESCE(SUM(access_count), 0),
+                COALESCE(SUM(length(CAST(text AS BLOB))), 0),
+                COALESCE(SUM(length(embedding)), 0)
+            FROM embeddings
+            GROUP BY model
+        """)
+
+    def _migrate_to_composite_key(self, conn: sqlite3.Connection) -> None:
+        """
+        Rebuild the table keyed by (content_hash, model, dimensions).
+
+        Older caches were keyed by content_hash alone, so a text could only
+        be cached for one model and size at a time.
+        """
+        cursor = conn.cursor()
+        self._create_table(cursor, "embeddings_migrated")
+        cursor.execute("""
+            INSERT OR IGNORE INTO embeddings_migrated
+            (content_hash, text, embedding, dtype, model, dimensions, token_count, created_at, accessed_at, access_count)
+            SELECT content_hash, text, embedding, dtype, model, dimensions, token_count, created_at, accessed_at, access_count
+            FROM embeddings
+        """)
+        cursor.execute("DROP TABLE embeddings")
+        cursor.execute("ALTER TABLE embeddings_migrated RENAME TO embeddings")
+        conn.commit()
+
+    @staticmethod
+    def _add_text_codec_column(conn: sqlite3.Connection) -> None:
+        """Add the text_codec column; existing rows hold plain text."""
+        cursor = conn.cursor()
+        cursor.execute("PRAGMA table_info(embeddings)")
+        columns = {row[1] for row in cursor.fetchall()}
+        if "text_codec" not in columns:
+            cursor.execute(
+                "ALTER TABLE embeddings ADD COLUMN text_codec TEXT NOT NULL DEFAULT 'plain'"
+            )
+        conn.commit()
+
+    @staticmethod
+    def _migrate_to_binary(conn: sqlite3.Connection) -> int:
+        """
+        Convert legacy JSON-encoded embeddings to float32 BLOBs in place.
+
+        Args:
+            conn: Open connection to the cache database
+
+        Returns:
+            Number of rows converted
+        """
+        cursor = conn.cursor()
+        cursor.execute("PRAGMA table_info(embeddings)")
+        columns = {row[1] for row in cursor.fetchall()}
+        if "dtype" not in columns:
+            cursor.execute(
+                f"ALTER TABLE embeddings ADD COLUMN dtype TEXT NOT NULL DEFAULT '{EMBEDDING_DTYPE}'"
+            )
+
+        converted = 0
+        while True:
             cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_created_at ON embeddings(created_at)
-            """)
+                SELECT rowid, embedding FROM embeddings
+                WHERE typeof(embedding) = 'text'
+                LIMIT ?
+            """, (MIGRATION_CHUNK_SIZE,))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+
+            cursor.executemany(
+                "UPDATE embeddings SET embedding = ?, dtype = ? WHERE rowid = ?",
+                [(pack_embedding(json.loads(emb)), EMBEDDING_DTYPE, rowid) for rowid, emb in rows]
+            )
             conn.commit()
+            converted += len(rows)
+
+        return converted
 
     @staticmethod
     def compute_hash(text: str) -> str:
         """Compute SHA-256 hash of text."""
         return hashlib.sha256(text.encode()).hexdigest()
 
-    def get(self, text: str, model: str = "text-embedding-3-large") -> Optional[EmbeddingResult]:
+    def _record_access(self, keys: list[tuple[str, str, int]]) -> None:
+        """Queue (content_hash, model, dimensions) hits for the next batched flush."""
+        if not self.track_access or not keys:
+            return
+
+        now = datetime.now().isoformat()
+        with self._pending_lock:
+            for key in keys:
+                hits = self._pending_access.get(key, (0, now))[0]
+                self._pending_access[key] = (hits + 1, now)
+            due = (
+                len(self._pending_access) >= ACCESS_FLUSH_THRESHOLD
+                or time.monotonic() - self._last_flush >= ACCESS_FLUSH_INTERVAL
+            )
+
+        if due:
+            self.flush_access()
+
+    def flush_access(self) -> int:
+        """
+        Write pending hit counts and access times in one batched UPDATE.
+
+        Returns:
+            Number of embeddings whose tracking was updated
+        """
+        with self._pending_lock:
+            pending, self._pending_access = self._pending_access, {}
+            self._last_flush = time.monotonic()
+
+        if not pending:
+            return 0
+
+        with self._connect() as conn:
+            conn.executemany("""
+                UPDATE embeddings
+                SET accessed_at = ?, access_count = access_count + ?
+                WHERE content_hash = ? AND model = ? AND dimensions = ?
+            """, [
+                (accessed_at, hits, content_hash, model, dimensions)
+                for (content_hash, model, dimensions), (hits, accessed_at) in pending.items()
+            ])
+            conn.commit()
+
+        return len(pending)
+
+    def get(
+        self,
+        text: str,
+        model: str = "text-embedding-3-large",
+        dimensions: Optional[int] = None
+    ) -> Optional[EmbeddingResult]:
         """
         Retrieve cached embedding if it exists.
 
         Args:
             text: The text to look up
             model: The model name (must match)
+            dimensions: Requested size. None returns the largest cached size
 
         Returns:
             EmbeddingResult if found, None otherwise
         """
-        content_hash = self.compute_hash(text)
-
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT text, embedding, model, dimensions, token_count, created_at
-                FROM embeddings
-                WHERE content_hash = ? AND model = ?
-            """, (content_hash, model))
-
-            row = cursor.fetchone()
-            if row is None:
-                return None
-
-            # Update access tracking
-            cursor.execute("""
-                UPDATE embeddings
-                SET accessed_at = ?, access_count = access_count + 1
-                WHERE content_hash = ?
-            """, (datetime.now().isoformat(), content_hash))
-            conn.commit()
-
-            return EmbeddingResult(
-                text=row[0],
-                embedding=json.loads(row[1]),
-                model=row[2],
-                dimensions=row[3],
-                token_count=row[4],
-                created_at=datetime.fromisoformat(row[5])
-            )
+        return self.get_batch([text], model, dimensions)[text]
 
     def set(self, result: EmbeddingResult) -> None:
         """
@@ -112,110 +639,313 @@ class EmbeddingCache:
         Args:
             result: The EmbeddingResult to cache
         """
-        content_hash = result.content_hash
-        now = datetime.now().isoformat()
-
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                INSERT OR REPLACE INTO embeddings
-                (content_hash, text, embedding, model, dimensions, token_count, created_at, accessed_at, access_count)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, COALESCE(
-                    (SELECT access_count FROM embeddings WHERE content_hash = ?), 0
-                ) + 1)
-            """, (
-                content_hash,
-                result.text,
-                json.dumps(result.embedding),
-                result.model,
-                result.dimensions,
-                result.token_count,
-                result.created_at.isoformat(),
-                now,
-                content_hash
-            ))
-            conn.commit()
+        self.set_batch([result])
 
-    def exists(self, text: str, model: str = "text-embedding-3-large") -> bool:
+    def exists(
+        self,
+        text: str,
+        model: str = "text-embedding-3-large",
+        dimensions: Optional[int] = None
+    ) -> bool:
         """
         Check if an embedding exists in the cache.
 
         Args:
             text: The text to check
             model: The model name
+            dimensions: If given, only match embeddings of this size
 
         Returns:
             True if cached, False otherwise
         """
         content_hash = self.compute_hash(text)
+        dimension_filter = "" if dimensions is None else "AND dimensions = ?"
+        dimension_params = () if dimensions is None else (dimensions,)
 
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
-            cursor.execute("""
+            cursor.execute(f"""
                 SELECT 1 FROM embeddings
-                WHERE content_hash = ? AND model = ?
-            """, (content_hash, model))
+                WHERE content_hash = ? AND model = ? {dimension_filter}
+            """, (content_hash, model, *dimension_params))
             return cursor.fetchone() is not None
 
-    def get_batch(self, texts: list[str], model: str = "text-embedding-3-large") -> dict[str, Optional[EmbeddingResult]]:
+    def get_text(self, content_hash: str) -> Optional[str]:
+        """
+        Look up and inflate the stored source text for a content hash.
+
+        Args:
+            content_hash: SHA-256 hash of the text
+
+        Returns:
+            The source text, or None if unknown or stored with text_storage='none'
+        """
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT text, text_codec FROM embeddings
+                WHERE content_hash = ? AND text_codec != 'none'
+                LIMIT 1
+            """, (content_hash,))
+            row = cursor.fetchone()
+        return decode_text(row[0], row[1]) if row else None
+
+    def get_batch(
+        self,
+        texts: list[str],
+        model: str = "text-embedding-3-large",
+        dimensions: Optional[int] = None
+    ) -> dict[str, Optional[EmbeddingResult]]:
         """
         Retrieve multiple cached embeddings.
 
+        Checks the memory tier first (when ``dimensions`` is given), then looks
+        the remaining hashes up with chunked ``IN (...)`` queries on one
+        connection. Disk hits are promoted into the memory tier.
+
+        For text-embedding-3 models, a request for fewer dimensions than a
+        cached vector has is served by truncating and re-normalizing that
+        vector, so no API call is needed.
+
         Args:
             texts: List of texts to look up
             model: The model name
+            dimensions: Requested size. None returns the largest cached size
 
         Returns:
             Dictionary mapping text to EmbeddingResult (or None if not cached)
         """
-        results = {}
+        with self._lookup_seconds.time():
+            return self._get_batch(texts, model, dimensions)
+
+    def _get_batch(
+        self,
+        texts: list[str],
+        model: str,
+        dimensions: Optional[int]
+    ) -> dict[str, Optional[EmbeddingResult]]:
+        hash_to_texts: dict[str, list[str]] = {}
         for text in texts:
-            results[text] = self.get(text, model)
+            hash_to_texts.setdefault(self.compute_hash(text), []).append(text)
+
+        results: dict[str, Optional[EmbeddingResult]] = {text: None for text in texts}
+        found = []
+        hashes = []
+
+        for content_hash in hash_to_texts:
+            entry = None
+            if dimensions is not None:
+                entry = self._memory.get((model, dimensions, content_hash))
+            if entry is None:
+                hashes.append(content_hash)
+                continue
+            cached, source_dimensions = entry
+            found.append((content_hash, model, source_dimensions))
+            for text in hash_to_texts[content_hash]:
+                results[text] = cached
+
+        if not hashes:
+            self._record_access(found)
+            return results
+
+        if dimensions is None:
+            dimension_filter, dimension_params = "", ()
+        elif supports_truncation(model):
+            dimension_filter, dimension_params = "AND dimensions >= ?", (dimensions,)
+        else:
+            dimension_filter, dimension_params = "AND dimensions = ?", (dimensions,)
+
+        # Best row per hash: the exact size if cached, else the smallest larger one
+        # (or the largest size when no dimensions were requested)
+        best_rows: dict[str, tuple] = {}
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            for chunk_start in range(0, len(hashes), LOOKUP_CHUNK_SIZE):
+                chunk = hashes[chunk_start:chunk_start + LOOKUP_CHUNK_SIZE]
+                placeholders = ",".join("?" * len(chunk))
+                cursor.execute(f"""
+                    SELECT content_hash, embedding, dtype, model, dimensions, token_count, created_at
+                    FROM embeddings
+                    WHERE model = ? {dimension_filter} AND content_hash IN ({placeholders})
+                """, (model, *dimension_params, *chunk))
+
+                for row in cursor.fetchall():
+                    best = best_rows.get(row[0])
+                    if best is None:
+                        best_rows[row[0]] = row
+                    elif dimensions is None and row[4] > best[4]:
+                        best_rows[row[0]] = row
+                    elif dimensions is not None and row[4] < best[4]:
+                        best_rows[row[0]] = row
+
+        truncated_hits = 0
+        for content_hash, row in best_rows.items():
+            found.append((content_hash, row[3], row[4]))
+            texts_for_hash = hash_to_texts[content_hash]
+            embedding = unpack_embedding(row[1], row[2])
+            row_dimensions = row[4]
+            if dimensions is not None and row_dimensions > dimensions:
+                embedding = truncate_embedding(embedding, dimensions)
+                row_dimensions = dimensions
+                truncated_hits += 1
+
+            result = EmbeddingResult(
+                text=texts_for_hash[0],
+                embedding=embedding,
+                model=row[3],
+                dimensions=row_dimensions,
+                token_count=row[5],
+                created_at=datetime.fromisoformat(row[6])
+            )
+            self._memory.put((row[3], row_dimensions, content_hash), result, row[4])
+            for text in texts_for_hash:
+                results[text] = result
+
+        with self._pending_lock:
+            self._disk_hits += len(best_rows)
+            self._disk_misses += len(hashes) - len(best_rows)
+            self._truncated_hits += truncated_hits
+
+        self._record_access(found)
         return results
 
     def set_batch(self, results: list[EmbeddingResult]) -> None:
         """
-        Store multiple embeddings in the cache.
+        Store multiple embeddings in the cache in a single transaction.
 
         Args:
             results: List of EmbeddingResults to cache
         """
+        if not results:
+            return
+
+        with self._write_seconds.time():
+            self._set_batch(results)
+
+        if self.max_size_bytes is not None and self.get_size_bytes() > self.max_size_bytes:
+            self._start_maintenance()
+
+    def _set_batch(self, results: list[EmbeddingResult]) -> None:
+        now = datetime.now().isoformat()
+        rows = []
         for result in results:
-            self.set(result)
+            content_hash = result.content_hash
+            self._memory.put((result.model, result.dimensions, content_hash), result)
+            stored_text, text_codec = encode_text(result.text, self.text_storage)
+            rows.append((
+                content_hash,
+                stored_text,
+                text_codec,
+                pack_embedding(result.embedding),
+                EMBEDDING_DTYPE,
+                result.model,
+                result.dimensions,
+                result.token_count,
+                result.created_at.isoformat(),
+                now
+            ))
+
+        with self._connect() as conn:
+            conn.executemany("""
+                INSERT INTO embeddings
+                (content_hash, text, text_codec, embedding, dtype, model, dimensions, token_count, created_at, accessed_at, access_count)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1)
+                ON CONFLICT (content_hash, model, dimensions) DO UPDATE SET
+                    text = excluded.text,
+                    text_codec = excluded.text_codec,
+                    embedding = excluded.embedding,
+                    dtype = excluded.dtype,
+                    token_count = excluded.token_count,
+                    created_at = excluded.created_at,
+                    accessed_at = excluded.accessed_at,
+                    access_count = access_count + 1
+            """, rows)
+            conn.commit()
 
-    def get_stats(self) -> dict:
+    def get_stats(self, verify: bool = False) -> dict:
         """
         Get cache statistics.
 
+        Args:
+            verify: Recompute the counters with a full table scan and repair
+                them if they have drifted (slow on large caches)
+
         Returns:
             Dictionary with cache statistics
         """
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
+        self.flush_access()
 
-            cursor.execute("SELECT COUNT(*) FROM embeddings")
-            total = cursor.fetchone()[0]
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            stats_query = """
+                SELECT model, embeddings, tokens, accesses, text_bytes, vector_bytes
+                FROM cache_stats WHERE embeddings > 0
+            """
+            cursor.execute(stats_query)
+            rows = cursor.fetchall()
 
-            cursor.execute("SELECT COUNT(DISTINCT model) FROM embeddings")
-            models = cursor.fetchone()[0]
+            consistent = None
+            if verify:
+                cursor.execute("""
+                    SELECT
+                        model,
+                        COUNT(*),
+                        COALESCE(SUM(token_count), 0),
+                        COALESCE(SUM(access_count), 0),
+                        COALESCE(SUM(length(CAST(text AS BLOB))), 0),
+                        COALESCE(SUM(length(embedding)), 0)
+                    FROM embeddings
+                    GROUP BY model
+                """)
+                scanned = cursor.fetchall()
+                consistent = sorted(scanned) == sorted(rows)
+                if not consistent:
+                    self._rebuild_stats(cursor)
+                    conn.commit()
+                    rows = scanned
 
-            cursor.execute("SELECT SUM(token_count) FROM embeddings WHERE token_count IS NOT NULL")
-            total_tokens = cursor.fetchone()[0] or 0
+        total = sum(row[1] for row in rows)
+        total_tokens = sum(row[2] for row in rows)
+        total_accesses = sum(row[3] for row in rows)
 
-            cursor.execute("SELECT SUM(access_count) FROM embeddings")
-            total_accesses = cursor.fetchone()[0] or 0
+        stats = {
+            "tiers": self.get_tier_stats(),
+            "total_embeddings": total,
+            "unique_models": len(rows),
+            "total_tokens_cached": total_tokens,
+            "total_cache_hits": total_accesses - total,  # Accesses minus initial stores
+            "embeddings_by_model": {row[0]: row[1] for row in rows},
+            "storage_bytes": {
+                "text": sum(row[4] for row in rows),
+                "vectors": sum(row[5] for row in rows)
+            },
+            "estimated_savings": f"${total_tokens * 0.00000013:.4f}"  # Based on text-embedding-3-large pricing
+        }
+        if verify:
+            stats["counters_consistent"] = consistent
+        return stats
 
-            cursor.execute("SELECT model, COUNT(*) FROM embeddings GROUP BY model")
-            by_model = dict(cursor.fetchall())
+    def get_tier_stats(self) -> dict:
+        """
+        Get hit/miss counters for the memory and disk tiers.
 
-            return {
-                "total_embeddings": total,
-                "unique_models": models,
-                "total_tokens_cached": total_tokens,
-                "total_cache_hits": total_accesses - total,  # Accesses minus initial stores
-                "embeddings_by_model": by_model,
-                "estimated_savings": f"${total_tokens * 0.00000013:.4f}"  # Based on text-embedding-3-large pricing
+        Returns:
+            Dictionary with per-tier counters and memory tier occupancy
+        """
+        return {
+            "memory": {
+                "hits": self._memory.hits,
+                "misses": self._memory.misses,
+                "entries": len(self._memory),
+                "bytes": self._memory.current_bytes,
+                "max_bytes": self._memory.max_bytes
+            },
+            "disk": {
+                "hits": self._disk_hits,
+                "misses": self._disk_misses,
+                "truncated_hits": self._truncated_hits
             }
+        }
 
     def clear(self, model: Optional[str] = None) -> int:
         """
@@ -227,7 +957,9 @@ class EmbeddingCache:
         Returns:
             Number of embeddings deleted
         """
-        with sqlite3.connect(self.db_path) as conn:
+        self._memory.clear(model)
+
+        with self._connect() as conn:
             cursor = conn.cursor()
 
             if model:
@@ -251,9 +983,17 @@ class EmbeddingCache:
         """
         from datetime import timedelta
         cutoff = (datetime.now() - timedelta(days=days)).isoformat()
+        self.flush_access()
 
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
+            # One write transaction, so the rows listed are exactly the rows deleted
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute("""
+                SELECT model, dimensions, content_hash FROM embeddings
+                WHERE accessed_at < ?
+            """, (cutoff,))
+            pruned = set(cursor.fetchall())
             cursor.execute("""
                 DELETE FROM embeddings
                 WHERE accessed_at < ?
@@ -261,4 +1001,181 @@ class EmbeddingCache:
 
             deleted = cursor.rowcount
             conn.commit()
-            return deleted
+
+        self._memory.discard(pruned)
+        return deleted
+
+    def iter_vectors(
+        self,
+        model: str = "text-embedding-3-large",
+        dimensions: int = 3072,
+        exclude: Optional[Collection[str]] = None
+    ) -> Iterator[tuple[str, np.ndarray]]:
+        """
+        Stream (content_hash, vector) pairs for one model and size.
+
+        Hashes are listed first and vectors fetched in chunks, so hashes in
+        ``exclude`` are never read from disk.
+
+        Args:
+            model: The model name
+            dimensions: The vector size
+            exclude: Content hashes to skip
+
+        Yields:
+            (content_hash, read-only float32 vector) tuples
+        """
+        exclude = exclude or ()
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT content_hash FROM embeddings
+                WHERE model = ? AND dimensions = ?
+                ORDER BY rowid
+            """, (model, dimensions))
+            hashes = [row[0] for row in cursor.fetchall() if row[0] not in exclude]
+
+        for chunk_start in range(0, len(hashes), LOOKUP_CHUNK_SIZE):
+            chunk = hashes[chunk_start:chunk_start + LOOKUP_CHUNK_SIZE]
+            placeholders = ",".join("?" * len(chunk))
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute(f"""
+                    SELECT content_hash, embedding, dtype FROM embeddings
+                    WHERE model = ? AND dimensions = ? AND content_hash IN ({placeholders})
+                """, (model, dimensions, *chunk))
+                vectors = {row[0]: unpack_embedding(row[1], row[2]) for row in cursor.fetchall()}
+
+            for content_hash in chunk:
+                if content_hash in vectors:
+                    yield content_hash, vectors[content_hash]
+
+    def export_vectors(
+        self,
+        path_prefix: str,
+        model: str = "text-embedding-3-large",
+        dimensions: int = 3072,
+        rebuild: bool = False
+    ):
+        """
+        Export cached vectors to a memory-mappable VectorStore.
+
+        Re-running against an existing store only appends new vectors.
+
+        Args:
+            path_prefix: Path prefix for the store files
+            model: Model whose vectors to export
+            dimensions: Vector size to export
+            rebuild: Discard any existing store and export from scratch
+
+        Returns:
+            The refreshed VectorStore
+        """
+        from .vector_store import VectorStore
+        return VectorStore.export(self, path_prefix, model, dimensions, rebuild=rebuild)
+
+    def get_size_bytes(self) -> int:
+        """
+        Get the space used by live pages (excludes free pages awaiting reclaim).
+
+        Returns:
+            Size of the cache data in bytes
+        """
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute("PRAGMA page_size")
+            page_size = cursor.fetchone()[0]
+            cursor.execute("PRAGMA page_count")
+            page_count = cursor.fetchone()[0]
+            cursor.execute("PRAGMA freelist_count")
+            free_pages = cursor.fetchone()[0]
+            return (page_count - free_pages) * page_size
+
+    def evict_to_size(self, max_size_bytes: Optional[int] = None) -> int:
+        """
+        Evict embeddings until the cache fits its size budget.
+
+        Deletes rows in small transactions (EVICTION_CHUNK_ROWS at a time)
+        ordered by the configured eviction policy, so concurrent readers and
+        writers are never blocked for long.
+
+        Args:
+            max_size_bytes: Size budget. Defaults to the cache's max_size_mb
+
+        Returns:
+            Number of embeddings deleted
+        """
+        if max_size_bytes is None:
+            max_size_bytes = self.max_size_bytes
+        if max_size_bytes is None:
+            return 0
+
+        if self.eviction_policy == "lfu":
+            order_by = "access_count ASC, accessed_at ASC"
+        else:
+            order_by = "accessed_at ASC"
+
+        self.flush_access()
+
+        deleted = 0
+        evicted: set[tuple[str, int, str]] = set()
+        while self.get_size_bytes() > max_size_bytes:
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute("BEGIN IMMEDIATE")
+                cursor.execute(f"""
+                    SELECT rowid, model, dimensions, content_hash FROM embeddings
+                    ORDER BY {order_by} LIMIT ?
+                """, (EVICTION_CHUNK_ROWS,))
+                rows = cursor.fetchall()
+                cursor.executemany("DELETE FROM embeddings WHERE rowid = ?", [(row[0],) for row in rows])
+                conn.commit()
+
+            if not rows:
+                break
+            deleted += len(rows)
+            evicted.update(row[1:] for row in rows)
+
+        # Evicted rows must not keep being served from memory
+        self._memory.discard(evicted)
+        return deleted
+
+    def reclaim_space(self) -> None:
+        """
+        Return free pages to the filesystem.
+
+        Uses incremental_vacuum in small steps when the database was created
+        with auto_vacuum=INCREMENTAL, and a full VACUUM otherwise.
+        """
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute("PRAGMA auto_vacuum")
+            incremental = cursor.fetchone()[0] == 2
+
+            if not incremental:
+                conn.execute("VACUUM")
+                return
+
+            while True:
+                cursor.execute("PRAGMA freelist_count")
+                if cursor.fetchone()[0] == 0:
+                    break
+                cursor.execute(f"PRAGMA incremental_vacuum({RECLAIM_CHUNK_PAGES})")
+                cursor.fetchall()
+                conn.commit()
+
+    def _start_maintenance(self) -> None:
+        """Run eviction and space reclaim on a background thread, one at a time."""
+        with self._maintenance_lock:
+            if self._maintenance_thread is not None and self._maintenance_thread.is_alive():
+                return
+            self._maintenance_thread = threading.Thread(
+                target=self._run_maintenance,
+                name="embedding-cache-eviction",
+                daemon=True
+            )
+            self._maintenance_thread.start()
+
+    def _run_maintenance(self) -> None:
+        if self.evict_to_size():
+            self.reclaim_space()
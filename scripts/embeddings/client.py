@@ -1,77 +1,314 @@
 """
-OpenAI embedding client with caching integration.
+Embedding client with caching integration.
 
 Provides high-level API for generating embeddings with automatic caching,
-rate limiting, and batch processing.
+rate limiting, and batch processing. ``aget_embeddings_batch`` is the asyncio
+variant that keeps several batches in flight at once. Vectors come from a
+pluggable backend (see ``backends``): the OpenAI API by default, or an
+offline deterministic backend for benchmarks and air-gapped runs.
+
+Transient backend errors are retried with exponential backoff and jitter, and a
+batch rejected as invalid is bisected to isolate the offending input, so a
+long run finishes and reports per-item failures instead of aborting.
+
+Duplicate texts are embedded once per call, and concurrent calls (from any
+thread or event loop in the process) that ask for the same text share a
+single in-flight request.
+
+``get_document_embeddings`` embeds long documents as paragraph chunks pooled
+into one vector, with the chunk vectors left in the cache for the RAG stage.
+
+``get_embeddings_iter`` streams results as batches finish and can record a
+checkpoint manifest, so a restarted run resumes after the last committed
+window of texts.
 """
 
+import asyncio
+import hashlib
+import json
 import os
+import random
+import threading
 import time
-from typing import Optional
+from concurrent.futures import Future
+from dataclasses import replace
+from datetime import datetime
 from pathlib import Path
-from dotenv import load_dotenv
+from typing import Any, Iterator, Optional, Sequence, Union
 
-from openai import OpenAI
+import numpy as np
 
-from .models import EmbeddingResult
+from .models import EmbeddingResult, EmbeddingFailure
 from .cache import EmbeddingCache
+from .metrics import ITEM_BUCKETS, REGISTRY, TOKEN_BUCKETS, MetricsRegistry
+from .backends import BackendResponse, EmbeddingBackend, OpenAIBackend
+from .tokens import count_tokens_batch, is_exact, reconcile
+from .similarity import (
+    SimilarityIndex,
+    cosine_similarity,
+    find_most_similar,
+    find_most_similar_batch
+)
+
+
+def load_checkpoint(checkpoint_path: str) -> Optional[dict]:
+    """Read a ``get_embeddings_iter`` checkpoint manifest, or None if absent."""
+    path = Path(checkpoint_path)
+    if not path.exists():
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _write_checkpoint(checkpoint_path: str, manifest: dict) -> None:
+    # Replace atomically so a crash never leaves a half-written manifest
+    path = Path(checkpoint_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+class EmbeddingBatchError(RuntimeError):
+    """Raised when some texts in a batch call could not be embedded."""
+
+    def __init__(self, failures: list[EmbeddingFailure], results: list[Optional[EmbeddingResult]]):
+        self.failures = failures
+        self.results = results
+        super().__init__(
+            f"{len(failures)} of {len(results)} texts failed to embed "
+            f"(first error: {failures[0].error})"
+        )
+
+
+# Process-wide registry of texts being embedded, keyed by (content_hash, model, dimensions)
+_inflight: dict[tuple[str, str, int], Future] = {}
+_inflight_lock = threading.Lock()
+
+
+def _reset_after_fork() -> None:
+    # Futures owned by the parent's threads would never resolve in the child
+    global _inflight_lock
+    _inflight.clear()
+    _inflight_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+class _InflightClaim:
+    """
+    Unique texts of one batch call, claimed against the in-flight registry.
+
+    Texts no other call is embedding are owned by this call (``texts``) and
+    must be resolved or released; the rest are awaited from their owners.
+    Outcomes are fanned back out to every input position of the text.
+    """
+
+    def __init__(self, texts: list[str], indices: list[int], model: str, dimensions: int):
+        self.model = model
+        self.dimensions = dimensions
+        self.positions: dict[str, list[int]] = {}
+        self.text_by_hash: dict[str, str] = {}
+        for text, index in zip(texts, indices):
+            content_hash = EmbeddingCache.compute_hash(text)
+            if content_hash not in self.positions:
+                self.positions[content_hash] = []
+                self.text_by_hash[content_hash] = text
+            self.positions[content_hash].append(index)
+
+        self.owned: dict[str, Future] = {}
+        self.waiting: dict[str, Future] = {}
+        with _inflight_lock:
+            for content_hash in self.positions:
+                key = (content_hash, model, dimensions)
+                future = _inflight.get(key)
+                if future is None:
+                    future = Future()
+                    _inflight[key] = future
+                    self.owned[content_hash] = future
+                else:
+                    self.waiting[content_hash] = future
+
+        self.hashes = list(self.owned)
+        self.texts = [self.text_by_hash[h] for h in self.hashes]
+        # Inputs served by another position or another call
+        self.coalesced = len(texts) - len(self.owned)
+
+    def _fan_out(
+        self,
+        content_hash: str,
+        outcome: Union[EmbeddingResult, EmbeddingFailure],
+        results: list[tuple[int, EmbeddingResult]],
+        failures: list[EmbeddingFailure]
+    ) -> None:
+        text = self.text_by_hash[content_hash]
+        for index in self.positions[content_hash]:
+            if isinstance(outcome, EmbeddingFailure):
+                failures.append(EmbeddingFailure(index, text, outcome.error))
+            else:
+                results.append((index, outcome))
 
-# Load environment variables from .env file
-load_dotenv()
+    def _publish(self, content_hash: str, outcome=None, error: Optional[BaseException] = None) -> None:
+        future = self.owned.pop(content_hash)
+        with _inflight_lock:
+            key = (content_hash, self.model, self.dimensions)
+            if _inflight.get(key) is future:
+                del _inflight[key]
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(outcome)
+
+    def resolve(
+        self,
+        batch_results: list[tuple[int, EmbeddingResult]],
+        batch_failures: list[EmbeddingFailure]
+    ) -> tuple[list[tuple[int, EmbeddingResult]], list[EmbeddingFailure]]:
+        """
+        Publish one batch's outcomes and fan them out to input positions.
+
+        Args:
+            batch_results: (position in ``self.texts``, result) pairs
+            batch_failures: Failures indexed by position in ``self.texts``
+
+        Returns:
+            (input-position results, input-position failures)
+        """
+        results, failures = [], []
+        outcomes = [(i, r) for i, r in batch_results] + [(f.index, f) for f in batch_failures]
+        for unique_index, outcome in outcomes:
+            content_hash = self.hashes[unique_index]
+            self._publish(content_hash, outcome)
+            self._fan_out(content_hash, outcome, results, failures)
+        return results, failures
+
+    def release(self, error: BaseException) -> None:
+        """
+        Fail every still-owned text so waiting calls don't hang.
+
+        Interrupts (GeneratorExit, KeyboardInterrupt, cancellation) only
+        concern this call, so waiters get an ordinary RuntimeError chained
+        from them; the caller re-raises the original.
+        """
+        if not isinstance(error, Exception):
+            aborted = RuntimeError("embedding call aborted")
+            aborted.__cause__ = error
+            error = aborted
+        for content_hash in list(self.owned):
+            self._publish(content_hash, error=error)
+
+    def _collect(self, content_hash: str, future: Future, results, failures) -> None:
+        try:
+            outcome = future.result()
+        except Exception as e:
+            outcome = EmbeddingFailure(-1, self.text_by_hash[content_hash], str(e))
+        self._fan_out(content_hash, outcome, results, failures)
+
+    def wait(self) -> tuple[list[tuple[int, EmbeddingResult]], list[EmbeddingFailure]]:
+        """Block until texts owned by other calls are embedded."""
+        results, failures = [], []
+        for content_hash, future in self.waiting.items():
+            self._collect(content_hash, future, results, failures)
+        return results, failures
+
+    async def await_waiting(self) -> tuple[list[tuple[int, EmbeddingResult]], list[EmbeddingFailure]]:
+        """Asyncio variant of ``wait``."""
+        results, failures = [], []
+        for content_hash, future in self.waiting.items():
+            await asyncio.wait([asyncio.wrap_future(future)])
+            self._collect(content_hash, future, results, failures)
+        return results, failures
+
+
+def _failed_with(
+    outcome: tuple[list[tuple[int, EmbeddingResult]], list[EmbeddingFailure]],
+    error: Exception
+) -> bool:
+    """Whether a bisected half embedded nothing and failed with the same error."""
+    results, failures = outcome
+    return not results and all(f.error == str(error) for f in failures)
 
 
 class EmbeddingClient:
-    """OpenAI embedding client with caching and rate limiting."""
+    """Embedding client with caching, batching and retries over a pluggable backend."""
 
     DEFAULT_MODEL = "text-embedding-3-large"
     DEFAULT_DIMENSIONS = 3072
-    RATE_LIMIT_DELAY = 0.1  # Seconds between API calls
-    BATCH_SIZE = 100  # Max texts per API call
+    MAX_BATCH_ITEMS = 2048  # Max texts per API call (API limit)
+    MAX_BATCH_TOKENS = 250000  # Token budget per API call (API ceiling is 300k)
+    LONG_TEXT_TOKENS = 512  # Texts above this are packed in a separate stream
+    MAX_CONCURRENT_BATCHES = 4  # Batches in flight at once on the async path
+    ITER_WINDOW_ITEMS = 2048  # Contiguous texts committed per checkpoint by get_embeddings_iter
+    MAX_RETRIES = 5  # Attempts per batch for transient errors
+    RETRY_BASE_DELAY = 1.0  # Seconds; doubled on each retry
+    RETRY_MAX_DELAY = 60.0  # Upper bound for a single backoff
 
     def __init__(
         self,
         api_key: Optional[str] = None,
-        model: str = DEFAULT_MODEL,
-        dimensions: int = DEFAULT_DIMENSIONS,
+        model: Optional[str] = None,
+        dimensions: Optional[int] = None,
         use_cache: bool = True,
-        cache_path: Optional[str] = None
+        cache_path: Optional[str] = None,
+        max_batch_items: Optional[int] = None,
+        max_batch_tokens: Optional[int] = None,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+        track_cache_access: bool = True,
+        cache_max_size_mb: Optional[float] = None,
+        cache_text_storage: str = "full",
+        backend: Optional[EmbeddingBackend] = None,
+        metrics: Optional[MetricsRegistry] = None
     ):
         """
         Initialize the embedding client.
 
         Args:
             api_key: OpenAI API key. If None, reads from OPENAI_API_KEY env var
-            model: Embedding model to use
-            dimensions: Embedding dimensions (3072 for text-embedding-3-large)
+                (only used when no backend is given)
+            model: Embedding model to use (defaults to the backend's default model)
+            dimensions: Embedding dimensions (defaults to the backend's default,
+                3072 for text-embedding-3-large)
             use_cache: Whether to use SQLite caching
             cache_path: Custom path for cache database
+            max_batch_items: Max texts per API call (defaults to MAX_BATCH_ITEMS)
+            max_batch_tokens: Token budget per API call (defaults to MAX_BATCH_TOKENS)
+            requests_per_minute: Initial request budget for the OpenAI rate limiter
+            tokens_per_minute: Initial token budget for the OpenAI rate limiter
+            track_cache_access: Whether cache hits update access tracking
+            cache_max_size_mb: On-disk size budget for the cache (None = unbounded)
+            cache_text_storage: How the cache keeps source text
+                ('full', 'zlib', 'zstd' or 'none')
+            backend: Embedding backend (defaults to OpenAIBackend)
+            metrics: Registry for latency/throughput metrics (defaults to the
+                process-wide registry)
         """
-        # Get API key from environment if not provided
-        if api_key is None:
-            api_key = os.getenv("OPENAI_API_KEY")
-            if api_key is None:
-                # Try loading from .env file
-                env_path = Path(__file__).parent.parent.parent / ".env"
-                if env_path.exists():
-                    with open(env_path) as f:
-                        for line in f:
-                            if line.startswith("OPENAI_API_KEY="):
-                                api_key = line.split("=", 1)[1].strip().strip('"\'')
-                                break
-
-        if api_key is None:
-            raise ValueError(
-                "OpenAI API key not found. Set OPENAI_API_KEY environment variable "
-                "or pass api_key parameter."
+        if backend is None:
+            backend = OpenAIBackend(
+                api_key=api_key,
+                requests_per_minute=requests_per_minute,
+                tokens_per_minute=tokens_per_minute
             )
 
-        self.client = OpenAI(api_key=api_key)
-        self.model = model
-        self.dimensions = dimensions
+        self.backend = backend
+        self.model = model or backend.default_model
+        self.dimensions = dimensions or backend.default_dimensions
+        self.max_batch_items = max_batch_items or self.MAX_BATCH_ITEMS
+        self.max_batch_tokens = max_batch_tokens or self.MAX_BATCH_TOKENS
         self.use_cache = use_cache
+        self.metrics = metrics or REGISTRY
 
         if use_cache:
-            self.cache = EmbeddingCache(cache_path)
+            self.cache = EmbeddingCache(
+                cache_path,
+                track_access=track_cache_access,
+                max_size_mb=cache_max_size_mb,
+                text_storage=cache_text_storage,
+                metrics=self.metrics
+            )
         else:
             self.cache = None
 
@@ -79,6 +316,41 @@ class EmbeddingClient:
         self._api_calls = 0
         self._cache_hits = 0
         self._tokens_used = 0
+        self._retries = 0
+        self._coalesced = 0
+        self.failures: list[EmbeddingFailure] = []
+        # Set once a request with this model/dimensions succeeds; from then
+        # on invalid-input errors are blamed on the texts, not the request
+        self._request_succeeded = False
+
+        # Per-request instrumentation (see embeddings.metrics)
+        self._request_seconds = self.metrics.histogram(
+            "embedding_request_seconds", "Backend request latency in seconds, excluding rate-limit wait"
+        )
+        self._request_errors = self.metrics.counter(
+            "embedding_request_errors_total", "Backend requests that raised"
+        )
+        self._retry_counter = self.metrics.counter(
+            "embedding_retries_total", "Backend requests retried after a transient error"
+        )
+        self._rate_limit_wait = self.metrics.histogram(
+            "embedding_rate_limit_wait_seconds", "Seconds a request was held back by the rate limiter"
+        )
+        self._batch_items = self.metrics.histogram(
+            "embedding_batch_items", "Texts per backend request", ITEM_BUCKETS
+        )
+        self._batch_tokens = self.metrics.histogram(
+            "embedding_batch_tokens", "Tokens per backend request", TOKEN_BUCKETS
+        )
+        self._items_counter = self.metrics.counter(
+            "embedding_items_total", "Texts embedded by the backend"
+        )
+        self._tokens_counter = self.metrics.counter(
+            "embedding_tokens_total", "Tokens consumed by the backend"
+        )
+        self._cache_hit_counter = self.metrics.counter(
+            "embedding_cache_hits_total", "Texts served from the cache"
+        )
 
     def get_embedding(self, text: str, skip_cache: bool = False) -> EmbeddingResult:
         """
@@ -93,119 +365,658 @@ class EmbeddingClient:
         """
         # Check cache first
         if self.use_cache and not skip_cache:
-            cached = self.cache.get(text, self.model)
+            cached = self.cache.get(text, self.model, self.dimensions)
             if cached is not None:
                 self._cache_hits += 1
+                self._cache_hit_counter.inc()
                 return cached
 
-        # Call OpenAI API
-        response = self.client.embeddings.create(
-            input=text,
-            model=self.model,
-            dimensions=self.dimensions
-        )
-
-        self._api_calls += 1
-        self._tokens_used += response.usage.total_tokens
-
-        result = EmbeddingResult(
-            text=text,
-            embedding=response.data[0].embedding,
-            model=self.model,
-            dimensions=self.dimensions,
-            token_count=response.usage.total_tokens
-        )
-
-        # Store in cache
-        if self.use_cache:
-            self.cache.set(result)
+        # Call the backend (retried on transient errors) and cache the result
+        response = self._embed_with_retry([text])
+        return self._process_response([text], response)[0]
 
-        return result
-
-    def get_embeddings_batch(
+    def _lookup_cached(
         self,
         texts: list[str],
-        skip_cache: bool = False,
-        show_progress: bool = True
-    ) -> list[EmbeddingResult]:
+        skip_cache: bool
+    ) -> tuple[list[tuple[int, EmbeddingResult]], list[str], list[int]]:
         """
-        Get embeddings for multiple texts with rate limiting.
-
-        Args:
-            texts: List of texts to embed
-            skip_cache: If True, skip cache and always call API
-            show_progress: If True, print progress updates
+        Split texts into cache hits and texts that still need embedding.
 
         Returns:
-            List of EmbeddingResults
+            (cached (index, result) pairs, texts to embed, their original indices)
         """
         results = []
         texts_to_embed = []
         text_indices = []
 
-        # Check cache for all texts first
         if self.use_cache and not skip_cache:
+            cached_by_text = self.cache.get_batch(texts, self.model, self.dimensions)
             for i, text in enumerate(texts):
-                cached = self.cache.get(text, self.model)
+                cached = cached_by_text[text]
                 if cached is not None:
                     self._cache_hits += 1
+                    self._cache_hit_counter.inc()
                     results.append((i, cached))
                 else:
                     texts_to_embed.append(text)
                     text_indices.append(i)
         else:
-            texts_to_embed = texts
+            texts_to_embed = list(texts)
             text_indices = list(range(len(texts)))
 
+        return results, texts_to_embed, text_indices
+
+    def _backoff_delay(self, attempt: int) -> float:
+        """Exponential backoff with full jitter for the given retry attempt."""
+        return random.uniform(0, min(self.RETRY_MAX_DELAY, self.RETRY_BASE_DELAY * 2 ** attempt))
+
+    def _observe_request(self, started: float, response: Optional[BackendResponse]) -> None:
+        """Record latency, batch size and rate-limit wait for one backend call (None = failed)."""
+        if response is None:
+            self._request_errors.inc()
+            return
+        elapsed = time.perf_counter() - started
+        self._request_seconds.observe(max(0.0, elapsed - response.rate_limit_wait))
+        self._rate_limit_wait.observe(response.rate_limit_wait)
+        self._batch_items.observe(len(response.embeddings))
+        self._batch_tokens.observe(response.total_tokens)
+
+    def _embed_with_retry(self, batch_texts: list[str]) -> BackendResponse:
+        """Embed one batch with the backend, retrying transient errors with backoff."""
+        for attempt in range(self.MAX_RETRIES):
+            started = time.perf_counter()
+            try:
+                response = self.backend.embed(batch_texts, self.model, self.dimensions)
+            except Exception as e:
+                self._observe_request(started, None)
+                if not self.backend.is_retryable(e) or attempt == self.MAX_RETRIES - 1:
+                    raise
+                self._retries += 1
+                self._retry_counter.inc()
+                time.sleep(self._backoff_delay(attempt))
+            else:
+                self._observe_request(started, response)
+                return response
+
+    async def _aembed_with_retry(self, session: Any, batch_texts: list[str]) -> BackendResponse:
+        """Asyncio variant of ``_embed_with_retry``."""
+        for attempt in range(self.MAX_RETRIES):
+            started = time.perf_counter()
+            try:
+                response = await self.backend.aembed(session, batch_texts, self.model, self.dimensions)
+            except Exception as e:
+                self._observe_request(started, None)
+                if not self.backend.is_retryable(e) or attempt == self.MAX_RETRIES - 1:
+                    raise
+                self._retries += 1
+                self._retry_counter.inc()
+                await asyncio.sleep(self._backoff_delay(attempt))
+            else:
+                self._observe_request(started, response)
+                return response
+
+    def _embed_resilient(
+        self,
+        batch_texts: list[str],
+        batch_indices: list[int]
+    ) -> tuple[list[tuple[int, EmbeddingResult]], list[EmbeddingFailure]]:
+        """
+        Embed one batch, bisecting on invalid-input errors.
+
+        Bisection isolates the offending texts. When both halves fail outright
+        with the batch's own error and no request from this client has ever
+        succeeded, the request itself is invalid (e.g. an unsupported
+        ``dimensions``), so the error is raised once instead of being split
+        down to every single text.
+
+        Returns:
+            (embedded (index, result) pairs, per-item failures)
+        """
+        try:
+            response = self._embed_with_retry(batch_texts)
+        except Exception as e:
+            if self.backend.is_invalid_input(e) and len(batch_texts) > 1:
+                mid = len(batch_texts) // 2
+                left = self._embed_resilient(batch_texts[:mid], batch_indices[:mid])
+                right = self._embed_resilient(batch_texts[mid:], batch_indices[mid:])
+                if not self._request_succeeded and _failed_with(left, e) and _failed_with(right, e):
+                    raise
+                return left[0] + right[0], left[1] + right[1]
+            if not (self.backend.is_invalid_input(e) or self.backend.is_retryable(e)):
+                raise
+            return [], [
+                EmbeddingFailure(index, text, str(e))
+                for index, text in zip(batch_indices, batch_texts)
+            ]
+
+        batch_results = self._process_response(batch_texts, response)
+        return list(zip(batch_indices, batch_results)), []
+
+    async def _aembed_resilient(
+        self,
+        session: Any,
+        batch_texts: list[str],
+        batch_indices: list[int]
+    ) -> tuple[list[tuple[int, EmbeddingResult]], list[EmbeddingFailure]]:
+        """Asyncio variant of ``_embed_resilient``."""
+        try:
+            response = await self._aembed_with_retry(session, batch_texts)
+        except Exception as e:
+            if self.backend.is_invalid_input(e) and len(batch_texts) > 1:
+                mid = len(batch_texts) // 2
+                left = await self._aembed_resilient(session, batch_texts[:mid], batch_indices[:mid])
+                right = await self._aembed_resilient(session, batch_texts[mid:], batch_indices[mid:])
+                if not self._request_succeeded and _failed_with(left, e) and _failed_with(right, e):
+                    raise
+                return left[0] + right[0], left[1] + right[1]
+            if not (self.backend.is_invalid_input(e) or self.backend.is_retryable(e)):
+                raise
+            return [], [
+                EmbeddingFailure(index, text, str(e))
+                for index, text in zip(batch_indices, batch_texts)
+            ]
+
+        batch_results = self._process_response(batch_texts, response)
+        return list(zip(batch_indices, batch_results)), []
+
+    def _assemble_results(
+        self,
+        texts: list[str],
+        results: list[tuple[int, EmbeddingResult]],
+        failures: list[EmbeddingFailure],
+        allow_partial: bool
+    ) -> list[Optional[EmbeddingResult]]:
+        """Order results by input position and surface any failures."""
+        ordered: list[Optional[EmbeddingResult]] = [None] * len(texts)
+        for index, result in results:
+            ordered[index] = result
+
+        failures.sort(key=lambda f: f.index)
+        self.failures.extend(failures)
+        if failures and not allow_partial:
+            raise EmbeddingBatchError(failures, ordered)
+        return ordered
+
+    def _claim(
+        self,
+        texts_to_embed: list[str],
+        text_indices: list[int],
+        show_progress: bool,
+        cache_hits: int
+    ) -> _InflightClaim:
+        """Dedupe uncached texts and claim them against other in-flight calls."""
+        claim = _InflightClaim(texts_to_embed, text_indices, self.model, self.dimensions)
+        self._coalesced += claim.coalesced
+
         if show_progress and texts_to_embed:
-            print(f"Cache hits: {len(results)}, API calls needed: {len(texts_to_embed)}")
+            print(
+                f"Cache hits: {cache_hits}, API calls needed: {len(claim.texts)}"
+                f" ({claim.coalesced} duplicates coalesced)"
+            )
+        return claim
 
-        # Process uncached texts in batches
-        for batch_start in range(0, len(texts_to_embed), self.BATCH_SIZE):
-            batch_end = min(batch_start + self.BATCH_SIZE, len(texts_to_embed))
-            batch_texts = texts_to_embed[batch_start:batch_end]
-            batch_indices = text_indices[batch_start:batch_end]
+    def _pack_batches(
+        self,
+        texts: list[str],
+        indices: list[int]
+    ) -> list[tuple[list[str], list[int]]]:
+        """
+        Pack texts into API batches by per-text token counts and item count.
 
-            if show_progress:
-                print(f"Processing batch {batch_start//self.BATCH_SIZE + 1}/"
-                      f"{(len(texts_to_embed) + self.BATCH_SIZE - 1)//self.BATCH_SIZE}")
+        Short and long texts are packed in separate streams, so short
+        keywords fill requests up to the item cap while long page texts
+        fill them up to the token budget.
 
-            # Call OpenAI API for batch
-            response = self.client.embeddings.create(
-                input=batch_texts,
+        Returns:
+            List of (batch texts, original indices) tuples
+        """
+        short_stream = []
+        long_stream = []
+        for text, index, tokens in zip(texts, indices, count_tokens_batch(texts)):
+            stream = long_stream if tokens > self.LONG_TEXT_TOKENS else short_stream
+            stream.append((text, index, tokens))
+
+        batches = []
+        for stream in (short_stream, long_stream):
+            batch_texts, batch_indices, batch_tokens = [], [], 0
+            for text, index, tokens in stream:
+                if batch_texts and (
+                    len(batch_texts) >= self.max_batch_items
+                    or batch_tokens + tokens > self.max_batch_tokens
+                ):
+                    batches.append((batch_texts, batch_indices))
+                    batch_texts, batch_indices, batch_tokens = [], [], 0
+                batch_texts.append(text)
+                batch_indices.append(index)
+                batch_tokens += tokens
+            if batch_texts:
+                batches.append((batch_texts, batch_indices))
+
+        return batches
+
+    def _process_response(self, batch_texts: list[str], response: BackendResponse) -> list[EmbeddingResult]:
+        """Turn one backend response into cached EmbeddingResults."""
+        self._api_calls += 1
+        self._tokens_used += response.total_tokens
+        self._request_succeeded = True
+        self._items_counter.inc(len(response.embeddings))
+        self._tokens_counter.inc(response.total_tokens)
+
+        # Per-text counts, scaled to sum to the usage the backend reported
+        token_counts = reconcile(count_tokens_batch(batch_texts), response.total_tokens)
+
+        batch_results = []
+        for j, embedding in enumerate(response.embeddings):
+            batch_results.append(EmbeddingResult(
+                text=batch_texts[j],
+                embedding=embedding,
                 model=self.model,
-                dimensions=self.dimensions
-            )
+                dimensions=self.dimensions,
+                token_count=token_counts[j]
+            ))
+
+        # Cache the whole batch in one transaction
+        if self.use_cache:
+            self.cache.set_batch(batch_results)
+
+        return batch_results
+
+    def get_embeddings_batch(
+        self,
+        texts: list[str],
+        skip_cache: bool = False,
+        show_progress: bool = True,
+        allow_partial: bool = False
+    ) -> list[Optional[EmbeddingResult]]:
+        """
+        Get embeddings for multiple texts under the shared rate limiter.
 
-            self._api_calls += 1
-            self._tokens_used += response.usage.total_tokens
+        Every batch is attempted even if some fail. Failed texts are recorded
+        in ``self.failures``; unless ``allow_partial`` is set, an
+        EmbeddingBatchError carrying the partial results is raised at the end.
 
-            # Process results
-            for j, embedding_data in enumerate(response.data):
-                original_idx = batch_indices[j]
-                original_text = batch_texts[j]
+        Args:
+            texts: List of texts to embed
+            skip_cache: If True, skip cache and always call API
+            show_progress: If True, print progress updates
+            allow_partial: If True, return None for failed texts instead of raising
 
-                result = EmbeddingResult(
-                    text=original_text,
-                    embedding=embedding_data.embedding,
-                    model=self.model,
-                    dimensions=self.dimensions,
-                    token_count=response.usage.total_tokens // len(batch_texts)  # Approximate
+        Returns:
+            List of EmbeddingResults (None for failures when allow_partial is set)
+        """
+        results, texts_to_embed, text_indices = self._lookup_cached(texts, skip_cache)
+        claim = self._claim(texts_to_embed, text_indices, show_progress, len(results))
+        failures = []
+
+        # Process unique uncached texts in token-packed batches
+        batches = self._pack_batches(claim.texts, list(range(len(claim.texts))))
+        try:
+            for batch_number, (batch_texts, batch_indices) in enumerate(batches, 1):
+                if show_progress:
+                    print(f"Processing batch {batch_number}/{len(batches)}")
+
+                # Call the backend for batch
+                batch_results, batch_failures = claim.resolve(
+                    *self._embed_resilient(batch_texts, batch_indices)
                 )
+                results.extend(batch_results)
+                failures.extend(batch_failures)
+        except BaseException as e:
+            claim.release(e)
+            raise
+
+        # Texts another call was already embedding
+        waited_results, waited_failures = claim.wait()
+        results.extend(waited_results)
+        failures.extend(waited_failures)
+
+        if show_progress and failures:
+            print(f"Failed to embed {len(failures)} texts")
+
+        return self._assemble_results(texts, results, failures, allow_partial)
+
+    async def aget_embeddings_batch(
+        self,
+        texts: list[str],
+        skip_cache: bool = False,
+        show_progress: bool = True,
+        max_concurrency: Optional[int] = None,
+        allow_partial: bool = False
+    ) -> list[Optional[EmbeddingResult]]:
+        """
+        Get embeddings for multiple texts with several batches in flight.
+
+        Batches are dispatched concurrently (bounded by a semaphore), written
+        to the cache as each one completes, and reassembled in input order.
+        Failures are handled as in ``get_embeddings_batch``.
+
+        Args:
+            texts: List of texts to embed
+            skip_cache: If True, skip cache and always call API
+            show_progress: If True, print progress updates
+            max_concurrency: Max batches in flight (defaults to MAX_CONCURRENT_BATCHES)
+            allow_partial: If True, return None for failed texts instead of raising
+
+        Returns:
+            List of EmbeddingResults in the same order as ``texts``
+        """
+        results, texts_to_embed, text_indices = self._lookup_cached(texts, skip_cache)
+        claim = self._claim(texts_to_embed, text_indices, show_progress, len(results))
+
+        semaphore = asyncio.Semaphore(max_concurrency or self.MAX_CONCURRENT_BATCHES)
+        batches = self._pack_batches(claim.texts, list(range(len(claim.texts))))
+        completed = 0
+
+        async def embed_batch(batch_texts: list[str], batch_indices: list[int]):
+            nonlocal completed
+            async with semaphore:
+                outcome = await self._aembed_resilient(session, batch_texts, batch_indices)
+
+            completed += 1
+            if show_progress:
+                print(f"Completed batch {completed}/{len(batches)}")
+            return claim.resolve(*outcome)
+
+        try:
+            # Async backend resources are bound to this event loop, so they live per call
+            async with self.backend.async_session() as session:
+                tasks = [
+                    asyncio.create_task(embed_batch(batch_texts, batch_indices))
+                    for batch_texts, batch_indices in batches
+                ]
+                try:
+                    completed_batches = await asyncio.gather(*tasks)
+                finally:
+                    # On failure, stop the other batches before the session closes
+                    # and before their claims are released
+                    for task in tasks:
+                        task.cancel()
+                    await asyncio.gather(*tasks, return_exceptions=True)
+        except BaseException as e:
+            claim.release(e)
+            raise
+
+        # Texts another call was already embedding
+        completed_batches.append(await claim.await_waiting())
+
+        failures = []
+        for batch_results, batch_failures in completed_batches:
+            results.extend(batch_results)
+            failures.extend(batch_failures)
+
+        if show_progress and failures:
+            print(f"Failed to embed {len(failures)} texts")
+
+        return self._assemble_results(texts, results, failures, allow_partial)
+
+    def _plan_document_chunks(
+        self,
+        texts: list[str],
+        headers: Optional[list[Optional[str]]]
+    ) -> list[list[str]]:
+        """
+        Split each document into the chunks embedded for it.
+
+        Bodies are chunked by ``rag.chunk_content`` (default settings) even
+        when they fit in one chunk, so the RAG stage finds every chunk in the
+        cache. The header, if any, is one extra chunk; an empty body leaves the
+        header alone, and a document with neither is embedded as-is.
+        """
+        from .analysis.rag import chunk_content
+
+        doc_chunks = []
+        for i, text in enumerate(texts):
+            header = headers[i] if headers else None
+            chunks = chunk_content(text)
+            if not chunks and not header:
+                chunks = [text]
+            doc_chunks.append(([header] if header else []) + chunks)
+        return doc_chunks
+
+    def _pool_document_chunks(
+        self,
+        texts: list[str],
+        doc_chunks: list[list[str]],
+        chunk_results: list[Optional[EmbeddingResult]],
+        chunk_failures: dict[int, EmbeddingFailure],
+        allow_partial: bool
+    ) -> list[Optional[EmbeddingResult]]:
+        """Pool chunk vectors into one result per document (token-weighted mean)."""
+        results: list[tuple[int, EmbeddingResult]] = []
+        failures: list[EmbeddingFailure] = []
+        offset = 0
+        for i, (text, chunks) in enumerate(zip(texts, doc_chunks)):
+            span = range(offset, offset + len(chunks))
+            offset += len(chunks)
+            failed = [chunk_failures[j] for j in span if j in chunk_failures]
+            if failed:
+                failures.append(EmbeddingFailure(i, text, failed[0].error))
+                continue
+
+            if len(chunks) == 1:
+                # Same vector as the cached chunk, reported for the whole document
+                results.append((i, replace(chunk_results[span[0]], text=text)))
+                continue
+
+            weights = np.asarray(count_tokens_batch(chunks), dtype=np.float32)
+            vectors = np.stack([np.asarray(chunk_results[j].embedding, dtype=np.float32) for j in span])
+            pooled = weights @ vectors / weights.sum()
+            norm = np.linalg.norm(pooled)
+            if norm > 0:
+                pooled /= norm
+            results.append((i, EmbeddingResult(
+                text=text,
+                embedding=pooled,
+                model=self.model,
+                dimensions=self.dimensions,
+                token_count=sum(chunk_results[j].token_count or 0 for j in span)
+            )))
+
+        return self._assemble_results(texts, results, failures, allow_partial)
+
+    def _take_chunk_failures(self, failures_before: int) -> dict[int, EmbeddingFailure]:
+        # Failures are reported per document rather than per chunk
+        chunk_failures = {f.index: f for f in self.failures[failures_before:]}
+        del self.failures[failures_before:]
+        return chunk_failures
+
+    def get_document_embeddings(
+        self,
+        texts: list[str],
+        headers: Optional[list[Optional[str]]] = None,
+        skip_cache: bool = False,
+        show_progress: bool = True,
+        allow_partial: bool = False
+    ) -> list[Optional[EmbeddingResult]]:
+        """
+        Embed whole documents by chunking and pooling instead of truncating.
+
+        Texts are split on paragraph boundaries by ``rag.chunk_content``
+        (default chunk settings, so the RAG stage finds the same chunks in the
+        cache). Every chunk of every document goes through one
+        ``get_embeddings_batch`` call, so chunking adds no extra round-trips
+        beyond the tokens themselves. Each document vector is the
+        token-weighted mean of its chunk vectors, re-normalized. Pooled
+        vectors are not cached; the chunk vectors are.
 
-                # Cache the result
-                if self.use_cache:
-                    self.cache.set(result)
+        Args:
+            texts: Document texts
+            headers: Optional short text per document (e.g. title and meta
+                description) embedded as one extra chunk of that document
+            skip_cache: If True, skip cache and always call the backend
+            show_progress: If True, print progress updates
+            allow_partial: If True, return None for failed documents instead of raising
+
+        Returns:
+            One pooled EmbeddingResult per document (``text`` is the document), in input order
+        """
+        doc_chunks = self._plan_document_chunks(texts, headers)
+        flat = [chunk for chunks in doc_chunks for chunk in chunks]
+        if show_progress:
+            print(f"Embedding {len(texts)} documents as {len(flat)} chunks")
+
+        failures_before = len(self.failures)
+        chunk_results = self.get_embeddings_batch(
+            flat, skip_cache=skip_cache, show_progress=show_progress, allow_partial=True
+        )
+        chunk_failures = self._take_chunk_failures(failures_before)
+        return self._pool_document_chunks(texts, doc_chunks, chunk_results, chunk_failures, allow_partial)
+
+    async def aget_document_embeddings(
+        self,
+        texts: list[str],
+        headers: Optional[list[Optional[str]]] = None,
+        skip_cache: bool = False,
+        show_progress: bool = True,
+        max_concurrency: Optional[int] = None,
+        allow_partial: bool = False
+    ) -> list[Optional[EmbeddingResult]]:
+        """
+        Asyncio variant of ``get_document_embeddings``.
+
+        Chunks go through ``aget_embeddings_batch``, so up to
+        ``max_concurrency`` batches are in flight.
+        """
+        doc_chunks = self._plan_document_chunks(texts, headers)
+        flat = [chunk for chunks in doc_chunks for chunk in chunks]
+        if show_progress:
+            print(f"Embedding {len(texts)} documents as {len(flat)} chunks")
+
+        failures_before = len(self.failures)
+        chunk_results = await self.aget_embeddings_batch(
+            flat, skip_cache=skip_cache, show_progress=show_progress,
+            max_concurrency=max_concurrency, allow_partial=True
+        )
+        chunk_failures = self._take_chunk_failures(failures_before)
+        return self._pool_document_chunks(texts, doc_chunks, chunk_results, chunk_failures, allow_partial)
+
+    def _fingerprint(self, texts: Sequence[str]) -> str:
+        """Identify an input sequence (and model) for checkpoint matching."""
+        digest = hashlib.sha256(f"{self.model}:{self.dimensions}:{len(texts)}".encode())
+        for text in texts:
+            digest.update(EmbeddingCache.compute_hash(text).encode())
+        return digest.hexdigest()
+
+    def resume_offset(self, texts: Sequence[str], checkpoint_path: str) -> int:
+        """
+        Number of leading texts a checkpoint has already committed.
+
+        Args:
+            texts: Input texts of the run
+            checkpoint_path: Checkpoint manifest path
+
+        Returns:
+            Committed text count, or 0 if there is no checkpoint for this input
+        """
+        manifest = load_checkpoint(checkpoint_path)
+        if manifest is None or manifest.get("fingerprint") != self._fingerprint(texts):
+            return 0
+        return manifest["completed"]
+
+    def get_embeddings_iter(
+        self,
+        texts: Sequence[str],
+        checkpoint_path: Optional[str] = None,
+        skip_cache: bool = False,
+        show_progress: bool = True,
+        window_items: Optional[int] = None
+    ) -> Iterator[tuple[int, EmbeddingResult]]:
+        """
+        Stream embeddings as ``(index, result)`` pairs as each batch finishes.
+
+        Texts are processed in contiguous windows. Once every result of a
+        window has been consumed, the checkpoint manifest (if given) is
+        updated, and a later call with the same texts and checkpoint resumes
+        after the last committed window. Memory stays flat in the input size.
+        Failed texts are not yielded; they are recorded in ``self.failures``
+        and in the manifest.
 
-                results.append((original_idx, result))
+        Args:
+            texts: Texts to embed
+            checkpoint_path: Manifest path for checkpoint/resume (None = no checkpoint)
+            skip_cache: If True, skip cache and always call the backend
+            show_progress: If True, print progress updates
+            window_items: Texts per checkpointed window (defaults to ITER_WINDOW_ITEMS)
+
+        Yields:
+            (index into texts, EmbeddingResult) in completion order
+        """
+        window_items = window_items or self.ITER_WINDOW_ITEMS
+        start = 0
+        failures: list[EmbeddingFailure] = []
+        fingerprint = None
 
-            # Rate limiting between batches
-            if batch_end < len(texts_to_embed):
-                time.sleep(self.RATE_LIMIT_DELAY)
+        if checkpoint_path:
+            fingerprint = self._fingerprint(texts)
+            manifest = load_checkpoint(checkpoint_path)
+            if manifest is not None and manifest.get("fingerprint") == fingerprint:
+                start = manifest["completed"]
+                failures = [EmbeddingFailure(**f) for f in manifest["failures"]]
+                self.failures.extend(failures)
+                if show_progress and start:
+                    print(f"Resuming from checkpoint: {start}/{len(texts)} texts committed")
 
-        # Sort by original index and return just the results
-        results.sort(key=lambda x: x[0])
-        return [r[1] for r in results]
+        windows = range(start, len(texts), window_items)
+        for window_number, window_start in enumerate(windows, 1):
+            if show_progress:
+                print(f"Processing window {window_number}/{len(windows)}")
+
+            window = list(texts[window_start:window_start + window_items])
+            cached, texts_to_embed, text_indices = self._lookup_cached(window, skip_cache)
+            for i, result in cached:
+                yield window_start + i, result
+
+            # Group duplicates up front so each text is claimed by exactly one batch
+            positions: dict[str, list[int]] = {}
+            for text, index in zip(texts_to_embed, text_indices):
+                positions.setdefault(text, []).append(index)
+            unique_texts = list(positions)
+            if show_progress and texts_to_embed:
+                print(f"Cache hits: {len(cached)}, API calls needed: {len(unique_texts)}")
+
+            window_failures = []
+            for batch_texts, _ in self._pack_batches(unique_texts, list(range(len(unique_texts)))):
+                # Claim just before sending and resolve before yielding, so no
+                # in-flight claim is held while the consumer is suspended
+                claim = _InflightClaim(
+                    [text for text in batch_texts for _ in positions[text]],
+                    [index for text in batch_texts for index in positions[text]],
+                    self.model,
+                    self.dimensions
+                )
+                self._coalesced += claim.coalesced
+                try:
+                    batch_results, batch_failures = claim.resolve(
+                        *self._embed_resilient(claim.texts, list(range(len(claim.texts))))
+                    )
+                except BaseException as e:
+                    claim.release(e)
+                    raise
+                waited_results, waited_failures = claim.wait()
+
+                window_failures.extend(batch_failures + waited_failures)
+                for i, result in batch_results + waited_results:
+                    yield window_start + i, result
+
+            window_failures = [
+                EmbeddingFailure(window_start + f.index, f.text, f.error)
+                for f in sorted(window_failures, key=lambda f: f.index)
+            ]
+            self.failures.extend(window_failures)
+            failures.extend(window_failures)
+
+            # The consumer has handled every result of this window: commit it
+            if checkpoint_path:
+                _write_checkpoint(checkpoint_path, {
+                    "fingerprint": fingerprint,
+                    "model": self.model,
+                    "dimensions": self.dimensions,
+                    "total": len(texts),
+                    "completed": min(window_start + window_items, len(texts)),
+                    "failures": [f.to_dict() for f in failures],
+                    "updated_at": datetime.now().isoformat()
+                })
 
     def compute_similarity(self, embedding1: list[float], embedding2: list[float]) -> float:
         """
@@ -218,66 +1029,88 @@ class EmbeddingClient:
         Returns:
             Cosine similarity score (0 to 1)
         """
-        import numpy as np
-
-        vec1 = np.array(embedding1)
-        vec2 = np.array(embedding2)
-
-        dot_product = np.dot(vec1, vec2)
-        norm1 = np.linalg.norm(vec1)
-        norm2 = np.linalg.norm(vec2)
-
-        if norm1 == 0 or norm2 == 0:
-            return 0.0
-
-        return float(dot_product / (norm1 * norm2))
+        return cosine_similarity(embedding1, embedding2)
 
     def find_most_similar(
         self,
         query_embedding: list[float],
-        embeddings: list[list[float]],
+        embeddings: Union[list[list[float]], np.ndarray, SimilarityIndex],
         top_k: int = 5
     ) -> list[tuple[int, float]]:
         """
         Find most similar embeddings to a query.
 
+        Pass a prebuilt SimilarityIndex when searching the same candidates
+        repeatedly, so they are normalized only once.
+
         Args:
             query_embedding: Query embedding vector
-            embeddings: List of embeddings to search
+            embeddings: Embeddings to search, or a SimilarityIndex over them
             top_k: Number of results to return
 
         Returns:
             List of (index, similarity_score) tuples, sorted by similarity
         """
-        similarities = []
-        for i, emb in enumerate(embeddings):
-            sim = self.compute_similarity(query_embedding, emb)
-            similarities.append((i, sim))
+        return find_most_similar(query_embedding, embeddings, top_k)
+
+    def find_most_similar_batch(
+        self,
+        query_embeddings: list[list[float]],
+        embeddings: Union[list[list[float]], np.ndarray, SimilarityIndex],
+        top_k: int = 5
+    ) -> list[list[tuple[int, float]]]:
+        """
+        Find most similar embeddings for many queries with one matrix product.
+
+        Args:
+            query_embeddings: Query embedding vectors
+            embeddings: Embeddings to search, or a SimilarityIndex over them
+            top_k: Number of results per query
 
-        similarities.sort(key=lambda x: x[1], reverse=True)
-        return similarities[:top_k]
+        Returns:
+            One list of (index, similarity_score) tuples per query
+        """
+        return find_most_similar_batch(query_embeddings, embeddings, top_k)
 
-    def get_usage_stats(self) -> dict:
+    def get_usage_stats(self, verify_cache: bool = False) -> dict:
         """
         Get usage statistics.
 
+        Args:
+            verify_cache: Recompute cache statistics with a full table scan
+
         Returns:
             Dictionary with usage statistics
         """
         stats = {
             "api_calls": self._api_calls,
             "cache_hits": self._cache_hits,
+            "coalesced": self._coalesced,
             "tokens_used": self._tokens_used,
-            "estimated_cost": f"${self._tokens_used * 0.00000013:.6f}"  # text-embedding-3-large pricing
+            "token_counts": "exact" if is_exact() else "estimated",
+            "retries": self._retries,
+            "failed_items": len(self.failures),
+            "backend": self.backend.name,
+            "estimated_cost": f"${self._tokens_used * self.backend.price_per_token:.6f}",
+            "performance": self.metrics.summary()
         }
 
         if self.cache:
-            stats["cache_stats"] = self.cache.get_stats()
+            stats["cache_stats"] = self.cache.get_stats(verify=verify_cache)
 
         return stats
 
+    def close(self):
+        """Flush cache access tracking and release cache and backend resources."""
+        if self.cache:
+            self.cache.close()
+        self.backend.close()
+
     def reset_usage_stats(self):
         """Reset usage counters."""
         self._api_calls = 0
         self._cache_hits = 0
         self._tokens_used = 0
+        self._retries = 0
+        self._coalesced = 0
+        self.failures = []
@@ -0,0 +1,243 @@
+"""
+Lightweight in-process metrics for the embedding pipeline.
+
+Counters and fixed-bucket histograms live in a thread-safe registry that
+can be exported as JSON (with estimated percentiles) or in the Prometheus
+text exposition format. EmbeddingClient and EmbeddingCache record into the
+process-wide ``REGISTRY`` unless given their own.
+
+Recorded metrics:
+    embedding_request_seconds          Backend call latency (per attempt)
+    embedding_request_errors_total     Failed backend calls
+    embedding_retries_total            Retried backend calls
+    embedding_rate_limit_wait_seconds  Time held back by the rate limiter
+    embedding_batch_items              Texts per backend call
+    embedding_batch_tokens             Tokens per backend call
+    embedding_items_total              Texts embedded by the backend
+    embedding_tokens_total             Tokens consumed
+    embedding_cache_hits_total         Texts served from the cache
+    embedding_cache_lookup_seconds     Cache batch lookup latency
+    embedding_cache_write_seconds      Cache batch write latency
+"""
+
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional, Sequence
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+ITEM_BUCKETS = (1, 8, 32, 128, 512, 1024, 2048)
+TOKEN_BUCKETS = (100, 1000, 10000, 50000, 100000, 250000, 300000)
+SUMMARY_QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Counter:
+    """Monotonically increasing value."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, lock: threading.Lock):
+        self.name = name
+        self.help = help_text
+        self.value = 0
+        self._lock = lock
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+    def to_dict(self) -> dict:
+        return {"type": self.kind, "value": self.value}
+
+    def to_prometheus(self) -> list[str]:
+        return [f"{self.name} {_format_value(self.value)}"]
+
+
+class Histogram:
+    """Fixed-bucket histogram with sum, count, min and max."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float], lock: threading.Lock):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self._lock = lock
+
+    def observe(self, value: float) -> None:
+        slot = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        with self._lock:
+            self.counts[slot] += 1
+            self.sum += value
+            self.count += 1
+            self.min = min(self.min, value)
+            self.max = max(self.max, value)
+
+    @contextmanager
+    def time(self):
+        """Observe the wall-clock duration of a ``with`` block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate a quantile by linear interpolation within its bucket."""
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = self.buckets[i - 1] if i > 0 else min(self.min, self.buckets[0])
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                lower, upper = max(lower, self.min), min(upper, self.max)
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.max
+
+    def to_dict(self) -> dict:
+        data = {
+            "type": self.kind,
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else None,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "buckets": {
+                _format_value(bound): count
+                for bound, count in zip(list(self.buckets) + [math.inf], self.counts)
+            }
+        }
+        for q in SUMMARY_QUANTILES:
+            data[f"p{int(q * 100)}"] = self.quantile(q)
+        return data
+
+    def to_prometheus(self) -> list[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(list(self.buckets) + [math.inf], self.counts):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{{le="{_format_value(bound)}"}} {cumulative}')
+        lines.append(f"{self.name}_sum {_format_value(self.sum)}")
+        lines.append(f"{self.name}_count {self.count}")
+        return lines
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class MetricsRegistry:
+    """Thread-safe collection of named counters and histograms."""
+
+    def __init__(self):
+        self._metrics: dict[str, object] = {}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def counter(self, name: str, help_text: str = "") -> Counter:
+        """Get or create a counter."""
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = Counter(name, help_text, threading.Lock())
+                self._metrics[name] = metric
+            return metric
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str = "",
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        """Get or create a histogram."""
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = Histogram(name, help_text, buckets, threading.Lock())
+                self._metrics[name] = metric
+            return metric
+
+    def reset(self) -> None:
+        """Drop every metric and restart the run clock."""
+        with self._lock:
+            self._metrics.clear()
+            self.started_at = time.time()
+
+    def to_dict(self) -> dict:
+        """All metrics plus elapsed run time, JSON-serializable."""
+        with self._lock:
+            metrics = dict(self._metrics)
+        return {
+            "elapsed_seconds": time.time() - self.started_at,
+            "metrics": {name: metric.to_dict() for name, metric in sorted(metrics.items())}
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2)
+
+    def to_prometheus(self) -> str:
+        """Render metrics in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = dict(self._metrics)
+        lines = []
+        for name, metric in sorted(metrics.items()):
+            if metric.help:
+                lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(metric.to_prometheus())
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str) -> None:
+        """Write metrics to ``path``: Prometheus text for .prom/.txt, JSON otherwise."""
+        output = Path(path)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        text = self.to_prometheus() if output.suffix in (".prom", ".txt") else self.to_json()
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+    def summary(self) -> dict:
+        """
+        Per-run performance summary for printing.
+
+        Returns:
+            Throughput and latency figures derived from the recorded metrics
+        """
+        data = self.to_dict()
+        metrics = data["metrics"]
+        elapsed = data["elapsed_seconds"]
+
+        def value(name):
+            return metrics.get(name, {}).get("value", 0)
+
+        def stat(name, key):
+            return metrics.get(name, {}).get(key)
+
+        return {
+            "elapsed_seconds": round(elapsed, 3),
+            "items_per_second": round(value("embedding_items_total") / elapsed, 2) if elapsed else None,
+            "tokens_per_second": round(value("embedding_tokens_total") / elapsed, 2) if elapsed else None,
+            "requests": stat("embedding_request_seconds", "count") or 0,
+            "request_p50_seconds": stat("embedding_request_seconds", "p50"),
+            "request_p95_seconds": stat("embedding_request_seconds", "p95"),
+            "retries": value("embedding_retries_total"),
+            "rate_limit_wait_seconds": stat("embedding_rate_limit_wait_seconds", "sum") or 0.0,
+            "cache_hits": value("embedding_cache_hits_total"),
+            "cache_lookup_p95_seconds": stat("embedding_cache_lookup_seconds", "p95")
+        }
+
+
+# Process-wide default registry
+REGISTRY = MetricsRegistry()
@@ -10,9 +10,20 @@ from typing import Optional
 import hashlib
 
 
+def _vector_to_list(vector) -> list[float]:
+    """Return a JSON-serializable list for a list or NumPy embedding vector."""
+    return vector.tolist() if hasattr(vector, "tolist") else vector
+
+
 @dataclass
 class EmbeddingResult:
-    """Single embedding with metadata."""
+    """
+    Single embedding with metadata.
+
+    ``embedding`` is a NumPy float32 array: a read-only view over the cache
+    BLOB or the decoded API payload. Results built from JSON carry a list of
+    floats instead.
+    """
 
     text: str
     embedding: list[float]
@@ -30,7 +41,7 @@ class EmbeddingResult:
         """Convert to dictionary for JSON serialization."""
         return {
             "text": self.text,
-            "embedding": self.embedding,
+            "embedding": _vector_to_list(self.embedding),
             "model": self.model,
             "dimensions": self.dimensions,
             "token_count": self.token_count,
@@ -51,6 +62,22 @@ class EmbeddingResult:
         )
 
 
+@dataclass
+class EmbeddingFailure:
+    """A text that could not be embedded after retries and batch bisection."""
+
+    index: int
+    text: str
+    error: str
+
+    def to_dict(self) -> dict:
+        return {
+            "index": self.index,
+            "text": self.text,
+            "error": self.error
+        }
+
+
 @dataclass
 class ContentEmbedding:
     """Page content with embedding and metadata."""
@@ -80,7 +107,7 @@ class ContentEmbedding:
             "url": self.url,
             "title": self.title,
             "content": self.content,
-            "embedding": self.embedding,
+            "embedding": _vector_to_list(self.embedding),
             "word_count": self.word_count,
             "content_type": self.content_type,
             "meta_description": self.meta_description,
@@ -126,7 +153,7 @@ class KeywordEmbedding:
         """Convert to dictionary for JSON serialization."""
         return {
             "keyword": self.keyword,
-            "embedding": self.embedding,
+            "embedding": _vector_to_list(self.embedding),
             "search_volume": self.search_volume,
             "keyword_difficulty": self.keyword_difficulty,
             "intent": self.intent,
@@ -0,0 +1,197 @@
+"""
+Adaptive token-bucket rate limiting for embedding API calls.
+
+Tracks requests-per-minute and tokens-per-minute budgets as two token
+buckets, tightens them from the ``x-ratelimit-*`` response headers and backs
+off on 429s. Limiters are shared process-wide (see ``get_rate_limiter``), so
+every client and thread in a process draws from the same budget.
+"""
+
+import asyncio
+import os
+import re
+import threading
+import time
+from typing import Mapping, Optional
+
+DEFAULT_RETRY_AFTER = 1.0  # Seconds to pause after a 429 without retry-after
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Parse an API duration like '20ms', '1s' or '6m0s' into seconds."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def _header_int(headers: Mapping[str, str], name: str) -> Optional[int]:
+    value = headers.get(name)
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class RateLimiter:
+    """Thread-safe token buckets for requests and tokens per minute."""
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        """
+        Initialize the limiter with full buckets.
+
+        Args:
+            requests_per_minute: Request budget per minute
+            tokens_per_minute: Token budget per minute
+        """
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._requests = float(requests_per_minute)
+        self._tokens = float(tokens_per_minute)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(
+            float(self.requests_per_minute),
+            self._requests + elapsed * self.requests_per_minute / 60
+        )
+        self._tokens = min(
+            float(self.tokens_per_minute),
+            self._tokens + elapsed * self.tokens_per_minute / 60
+        )
+
+    def reserve(self, tokens: int) -> float:
+        """
+        Reserve budget for one request.
+
+        The budget is taken immediately (buckets may go negative), so
+        concurrent callers queue up behind each other instead of racing.
+
+        Args:
+            tokens: Estimated tokens the request will consume
+
+        Returns:
+            Seconds the caller should wait before sending
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._requests -= 1
+            self._tokens -= min(tokens, self.tokens_per_minute)
+            return max(
+                0.0,
+                -self._requests * 60 / self.requests_per_minute,
+                -self._tokens * 60 / self.tokens_per_minute,
+                self._blocked_until - now
+            )
+
+    def acquire(self, tokens: int) -> float:
+        """Block until a request of ``tokens`` fits the budget. Returns seconds waited."""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens: int) -> float:
+        """Asyncio variant of ``acquire``."""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def update_from_headers(self, headers: Mapping[str, str]) -> None:
+        """
+        Adjust budgets from ``x-ratelimit-*`` response headers.
+
+        Limits replace the configured budgets, and the remaining counts cap
+        the local buckets so other processes sharing the quota are respected.
+        """
+        limit_requests = _header_int(headers, "x-ratelimit-limit-requests")
+        limit_tokens = _header_int(headers, "x-ratelimit-limit-tokens")
+        remaining_requests = _header_int(headers, "x-ratelimit-remaining-requests")
+        remaining_tokens = _header_int(headers, "x-ratelimit-remaining-tokens")
+
+        with self._lock:
+            self._refill(time.monotonic())
+            if limit_requests:
+                self.requests_per_minute = limit_requests
+            if limit_tokens:
+                self.tokens_per_minute = limit_tokens
+            if remaining_requests is not None:
+                self._requests = min(self._requests, float(remaining_requests))
+            if remaining_tokens is not None:
+                self._tokens = min(self._tokens, float(remaining_tokens))
+
+    def penalize(self, headers: Optional[Mapping[str, str]] = None) -> float:
+        """
+        Record a 429: drain the buckets and pause until the server allows more.
+
+        Args:
+            headers: Headers of the 429 response (retry-after / reset values)
+
+        Returns:
+            Seconds new requests will be held back
+        """
+        headers = headers or {}
+        retry_after = None
+        if headers.get("retry-after-ms"):
+            retry_after = parse_duration(headers["retry-after-ms"] + "ms")
+        if retry_after is None:
+            retry_after = parse_duration(headers.get("retry-after"))
+        if retry_after is None:
+            resets = [
+                parse_duration(headers.get("x-ratelimit-reset-requests")),
+                parse_duration(headers.get("x-ratelimit-reset-tokens"))
+            ]
+            resets = [r for r in resets if r is not None]
+            retry_after = max(resets) if resets else DEFAULT_RETRY_AFTER
+
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._requests = min(self._requests, 0.0)
+            self._tokens = min(self._tokens, 0.0)
+            self._blocked_until = max(self._blocked_until, now + retry_after)
+        return retry_after
+
+
+_limiters: dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(key: str, requests_per_minute: int, tokens_per_minute: int) -> RateLimiter:
+    """
+    Return the process-wide limiter for ``key`` (typically the model name).
+
+    The first caller's budgets are used; later callers share that limiter.
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+            _limiters[key] = limiter
+        return limiter
+
+
+def _reset_after_fork() -> None:
+    # A forked child gets its own quota view and must not inherit held locks
+    global _limiters_lock
+    _limiters.clear()
+    _limiters_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,184 @@
+"""
+Vectorized cosine similarity and top-k search.
+
+Candidates are normalized once into a contiguous float32 matrix, so a query
+is a single matrix-vector product and a batch of queries is a single GEMM.
+Top-k selection uses ``argpartition`` (linear time) and only sorts the k
+winners. Build a ``SimilarityIndex`` once and reuse it for interactive
+lookups; over 100k vectors each query then takes milliseconds.
+"""
+
+from typing import Sequence, Union
+
+import numpy as np
+
+QUERY_BLOCK_ROWS = 256  # Queries scored per GEMM, bounds the score matrix size
+
+
+def normalize_rows(vectors, dtype=np.float32) -> np.ndarray:
+    """
+    Return vectors as a matrix (float32 by default) with unit-length rows.
+
+    Zero vectors stay zero, so they score 0 against everything.
+    """
+    matrix = np.array(vectors, dtype=dtype, ndmin=2)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+def cosine_similarity(embedding1, embedding2) -> float:
+    """Cosine similarity between two vectors (0.0 if either is zero)."""
+    vec1 = np.asarray(embedding1, dtype=np.float32)
+    vec2 = np.asarray(embedding2, dtype=np.float32)
+    norm = np.linalg.norm(vec1) * np.linalg.norm(vec2)
+    if norm == 0:
+        return 0.0
+    return float(np.dot(vec1, vec2) / norm)
+
+
+def pairwise_cosine_similarity(x, y=None) -> np.ndarray:
+    """
+    Cosine similarity between every row of x and every row of y.
+
+    Drop-in for ``sklearn.metrics.pairwise.cosine_similarity`` on dense
+    input (float64, zero rows score 0) without importing scikit-learn.
+
+    Args:
+        x: 2-D array-like of vectors
+        y: 2-D array-like of vectors (defaults to x)
+
+    Returns:
+        Similarity matrix of shape (len(x), len(y))
+    """
+    x_rows = normalize_rows(x, dtype=np.float64)
+    y_rows = x_rows if y is None else normalize_rows(y, dtype=np.float64)
+    return x_rows @ y_rows.T
+
+
+def select_top_k(scores: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Select the k highest scores along the last axis, best first.
+
+    Args:
+        scores: 1-D or 2-D array of scores
+        k: Number of results per row
+
+    Returns:
+        (indices, scores) with shape (..., min(k, n))
+    """
+    n = scores.shape[-1]
+    k = max(0, min(k, n))
+    if k == 0:
+        empty = np.empty(scores.shape[:-1] + (0,))
+        return empty.astype(np.int64), empty.astype(scores.dtype)
+
+    if k < n:
+        candidates = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    else:
+        candidates = np.broadcast_to(np.arange(n), scores.shape).copy()
+    candidate_scores = np.take_along_axis(scores, candidates, axis=-1)
+    order = np.argsort(-candidate_scores, axis=-1, kind="stable")
+    return (
+        np.take_along_axis(candidates, order, axis=-1),
+        np.take_along_axis(candidate_scores, order, axis=-1)
+    )
+
+
+class SimilarityIndex:
+    """Pre-normalized float32 candidate matrix for repeated top-k queries."""
+
+    def __init__(self, embeddings, normalized: bool = False):
+        """
+        Build an index over candidate vectors.
+
+        Args:
+            embeddings: Sequence of vectors or a 2-D array (e.g. a VectorStore matrix)
+            normalized: Rows are already unit length (and float32); use them
+                without copying, which keeps memory-mapped matrices shared
+        """
+        if normalized:
+            self.matrix = np.asarray(embeddings, dtype=np.float32)
+        else:
+            self.matrix = normalize_rows(embeddings) if len(embeddings) else np.empty((0, 0), np.float32)
+
+    def __len__(self) -> int:
+        return self.matrix.shape[0]
+
+    def scores(self, queries) -> np.ndarray:
+        """Cosine similarity of each query (row) against every candidate."""
+        return normalize_rows(queries) @ self.matrix.T
+
+    def search(self, query, top_k: int = 5) -> list[tuple[int, float]]:
+        """
+        Find the candidates most similar to one query.
+
+        Returns:
+            List of (index, similarity_score) tuples, best first
+        """
+        return self.search_batch([query], top_k)[0]
+
+    def search_batch(self, queries, top_k: int = 5) -> list[list[tuple[int, float]]]:
+        """
+        Find the most similar candidates for many queries at once.
+
+        Queries are scored in blocks of QUERY_BLOCK_ROWS, one GEMM per block.
+
+        Returns:
+            One list of (index, similarity_score) tuples per query, best first
+        """
+        if len(queries) == 0:
+            return []
+        if len(self) == 0:
+            return [[] for _ in range(len(queries))]
+
+        query_matrix = normalize_rows(queries)
+        results = []
+        for start in range(0, len(query_matrix), QUERY_BLOCK_ROWS):
+            block_scores = query_matrix[start:start + QUERY_BLOCK_ROWS] @ self.matrix.T
+            indices, scores = select_top_k(block_scores, top_k)
+            results.extend(
+                list(zip(row_indices.tolist(), row_scores.tolist()))
+                for row_indices, row_scores in zip(indices, scores)
+            )
+        return results
+
+
+def find_most_similar(
+    query,
+    embeddings: Union[Sequence, np.ndarray, SimilarityIndex],
+    top_k: int = 5
+) -> list[tuple[int, float]]:
+    """
+    Find the embeddings most similar to a query.
+
+    Args:
+        query: Query vector
+        embeddings: Candidate vectors, or a prebuilt SimilarityIndex
+        top_k: Number of results to return
+
+    Returns:
+        List of (index, similarity_score) tuples, best first
+    """
+    index = embeddings if isinstance(embeddings, SimilarityIndex) else SimilarityIndex(embeddings)
+    return index.search(query, top_k)
+
+
+def find_most_similar_batch(
+    queries,
+    embeddings: Union[Sequence, np.ndarray, SimilarityIndex],
+    top_k: int = 5
+) -> list[list[tuple[int, float]]]:
+    """
+    Find the most similar embeddings for many queries in one pass.
+
+    Args:
+        queries: Query vectors
+        embeddings: Candidate vectors, or a prebuilt SimilarityIndex
+        top_k: Number of results per query
+
+    Returns:
+        One list of (index, similarity_score) tuples per query, best first
+    """
+    index = embeddings if isinstance(embeddings, SimilarityIndex) else SimilarityIndex(embeddings)
+    return index.search_batch(queries, top_k)
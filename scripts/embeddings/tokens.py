@@ -0,0 +1,123 @@
+"""
+Per-text token counting for embedding requests.
+
+Counts come from tiktoken's cl100k_base encoding (the text-embedding-3
+tokenizer) when the package and its encoding file are available, and from a
+conservative ~3 characters-per-token heuristic otherwise (e.g. air-gapped
+runs). Counts are memoized by content hash, and ``reconcile`` scales a
+batch's per-item counts to the usage total the backend reported, so cached
+token counts always add up to what was billed.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from .cache import EmbeddingCache
+
+TOKENIZER_ENCODING = "cl100k_base"  # Tokenizer of the text-embedding-3 models
+TOKEN_CACHE_SIZE = 200000  # Memoized counts kept per process
+
+_encoding = None
+_encoding_loaded = False
+_lock = threading.Lock()
+_counts: "OrderedDict[str, int]" = OrderedDict()
+
+
+def heuristic_count(text: str) -> int:
+    """Conservatively estimate the token count of a text (~3 chars per token)."""
+    return len(text) // 3 + 1
+
+
+def _get_encoding():
+    """Load the tiktoken encoding once; None if tiktoken is unavailable."""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        with _lock:
+            if not _encoding_loaded:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding(TOKENIZER_ENCODING)
+                except Exception:
+                    # Not installed, or the encoding file can't be fetched offline
+                    _encoding = None
+                _encoding_loaded = True
+    return _encoding
+
+
+def is_exact() -> bool:
+    """Whether counts come from the real tokenizer rather than the heuristic."""
+    return _get_encoding() is not None
+
+
+def count_tokens_batch(texts: list[str]) -> list[int]:
+    """
+    Count tokens for each text, reusing memoized counts.
+
+    Args:
+        texts: Texts to count
+
+    Returns:
+        Token counts in input order
+    """
+    hashes = [EmbeddingCache.compute_hash(text) for text in texts]
+    counts: list[Optional[int]] = [None] * len(texts)
+    missing = []
+    with _lock:
+        for i, content_hash in enumerate(hashes):
+            count = _counts.get(content_hash)
+            if count is None:
+                missing.append(i)
+            else:
+                _counts.move_to_end(content_hash)
+                counts[i] = count
+
+    if missing:
+        encoding = _get_encoding()
+        missing_texts = [texts[i] for i in missing]
+        if encoding is not None:
+            fresh = [len(tokens) for tokens in encoding.encode_ordinary_batch(missing_texts)]
+        else:
+            fresh = [heuristic_count(text) for text in missing_texts]
+
+        with _lock:
+            for i, count in zip(missing, fresh):
+                counts[i] = count
+                _counts[hashes[i]] = count
+            while len(_counts) > TOKEN_CACHE_SIZE:
+                _counts.popitem(last=False)
+
+    return counts
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens for a single text."""
+    return count_tokens_batch([text])[0]
+
+
+def reconcile(counts: list[int], total: int) -> list[int]:
+    """
+    Scale per-item counts so they sum exactly to a reported usage total.
+
+    Counts are scaled proportionally and rounded with the largest-remainder
+    method, so exact tokenizer counts come back unchanged and heuristic ones
+    are corrected to what the backend actually billed.
+
+    Args:
+        counts: Local per-item token counts
+        total: Usage total reported for the same items
+
+    Returns:
+        Reconciled per-item counts
+    """
+    local_total = sum(counts)
+    if not counts or total <= 0 or local_total == total or local_total == 0:
+        return list(counts)
+
+    scaled = [count * total / local_total for count in counts]
+    reconciled = [int(value) for value in scaled]
+    shortfall = total - sum(reconciled)
+    by_remainder = sorted(range(len(counts)), key=lambda i: scaled[i] - reconciled[i], reverse=True)
+    for i in by_remainder[:shortfall]:
+        reconciled[i] += 1
+    return reconciled
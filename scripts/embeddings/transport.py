@@ -0,0 +1,152 @@
+"""
+Shared HTTP transport for API-backed embedding backends.
+
+Every OpenAIBackend in a process sends its requests through one pooled
+``httpx.Client`` (see ``get_http_client``), so keep-alive connections and
+TLS sessions are reused across clients, threads and many small batches
+instead of being renegotiated per client. HTTP/2 is used when the ``h2``
+package is installed (``pip install 'httpx[http2]'``).
+
+Async sessions get their own ``httpx.AsyncClient`` with the same settings,
+because an async connection pool is bound to the event loop it runs on.
+
+Pool limits and timeouts are process-wide (``configure_transport``). A
+forked child drops the inherited client without closing it (the sockets
+still belong to the parent) and builds a fresh one on first use.
+"""
+
+import atexit
+import importlib.util
+import os
+import threading
+from dataclasses import dataclass, replace
+from typing import Optional
+
+MAX_CONNECTIONS = 64  # Concurrent connections per pool
+MAX_KEEPALIVE_CONNECTIONS = 32  # Idle connections kept open for reuse
+KEEPALIVE_EXPIRY = 30.0  # Seconds an idle connection stays open
+CONNECT_TIMEOUT = 10.0  # Seconds to establish a connection
+REQUEST_TIMEOUT = 120.0  # Seconds to read a response
+
+
+@dataclass(frozen=True)
+class TransportConfig:
+    """Pool limits and timeouts for the shared HTTP transport."""
+
+    max_connections: int = MAX_CONNECTIONS
+    max_keepalive_connections: int = MAX_KEEPALIVE_CONNECTIONS
+    keepalive_expiry: float = KEEPALIVE_EXPIRY
+    connect_timeout: float = CONNECT_TIMEOUT
+    timeout: float = REQUEST_TIMEOUT
+    http2: Optional[bool] = None  # None = use HTTP/2 when h2 is installed
+
+
+_config = TransportConfig()
+_client = None
+_lock = threading.Lock()
+
+
+def http2_available() -> bool:
+    """Whether the optional ``h2`` package needed for HTTP/2 is installed."""
+    return importlib.util.find_spec("h2") is not None
+
+
+def _client_options(config: TransportConfig) -> dict:
+    import httpx
+
+    http2 = http2_available() if config.http2 is None else config.http2
+    return {
+        "limits": httpx.Limits(
+            max_connections=config.max_connections,
+            max_keepalive_connections=config.max_keepalive_connections,
+            keepalive_expiry=config.keepalive_expiry
+        ),
+        "timeout": httpx.Timeout(config.timeout, connect=config.connect_timeout),
+        "http2": http2,
+        "follow_redirects": True
+    }
+
+
+def get_transport_config() -> TransportConfig:
+    """Return the current process-wide transport settings."""
+    return _config
+
+
+def configure_transport(**options) -> TransportConfig:
+    """
+    Change the process-wide pool limits and timeouts.
+
+    The current shared client is closed; the next request builds a new one
+    with the updated settings, and backends pick it up automatically.
+
+    Args:
+        **options: TransportConfig fields to override
+
+    Returns:
+        The new TransportConfig
+    """
+    global _config, _client
+    unknown = set(options) - set(TransportConfig.__dataclass_fields__)
+    if unknown:
+        raise ValueError(f"Unknown transport option(s): {', '.join(sorted(unknown))}")
+
+    with _lock:
+        _config = replace(_config, **options)
+        previous, _client = _client, None
+    if previous is not None:
+        previous.close()
+    return _config
+
+
+def get_http_client():
+    """
+    Return the process-wide pooled ``httpx.Client``, creating it on first use.
+
+    Returns:
+        httpx.Client shared by every backend in this process
+    """
+    global _client
+    client = _client
+    if client is not None:
+        return client
+
+    import httpx
+
+    with _lock:
+        if _client is None:
+            _client = httpx.Client(**_client_options(_config))
+        return _client
+
+
+def create_async_http_client():
+    """
+    Build an ``httpx.AsyncClient`` with the shared transport settings.
+
+    The caller owns it and must close it (``async with``) on the same
+    event loop it was used on.
+    """
+    import httpx
+
+    return httpx.AsyncClient(**_client_options(_config))
+
+
+def close_transport() -> None:
+    """Close the shared client; a later request transparently opens a new one."""
+    global _client
+    with _lock:
+        previous, _client = _client, None
+    if previous is not None:
+        previous.close()
+
+
+def _reset_after_fork() -> None:
+    # The inherited pool's sockets belong to the parent: drop it unclosed
+    global _client, _lock
+    _client = None
+    _lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+atexit.register(close_transport)
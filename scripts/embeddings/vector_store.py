@@ -0,0 +1,157 @@
+"""
+Memory-mapped vector store exported from the embedding cache.
+
+Writes every cached vector for one (model, dimensions) pair into a
+contiguous float32 matrix that analysis processes can ``np.memmap``, so they
+share one page-cache copy of the vectors and start up without parsing JSON.
+
+Files written for a store at ``<prefix>``:
+    <prefix>.f32        Row-major little-endian float32 matrix (count x dimensions)
+    <prefix>.hashes     Fixed-width ASCII SHA-256 hex digests, one per row
+    <prefix>.meta.json  Model, dimensions, dtype and committed row count
+
+Refreshes are incremental: only hashes not yet in the store are appended.
+Rebuilds (or a model/dimensions change) are written to temporary files and
+swapped in with ``os.replace``, metadata last, so processes that already
+memory-mapped the old store keep a valid mapping.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Optional, TYPE_CHECKING
+
+import numpy as np
+
+from .cache import EMBEDDING_DTYPE
+
+if TYPE_CHECKING:
+    from .cache import EmbeddingCache
+
+HASH_DTYPE = "S64"  # SHA-256 hex digest
+
+
+class VectorStore:
+    """Read-only view over an exported vector matrix and its hash index."""
+
+    def __init__(self, path_prefix: str):
+        """
+        Open an exported vector store.
+
+        Args:
+            path_prefix: Path prefix the store was exported to
+        """
+        self.path_prefix = str(path_prefix)
+        self.matrix_path = Path(f"{path_prefix}.f32")
+        self.hashes_path = Path(f"{path_prefix}.hashes")
+        self.meta_path = Path(f"{path_prefix}.meta.json")
+
+        with open(self.meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+
+        self.model = meta["model"]
+        self.dimensions = meta["dimensions"]
+        self.count = meta["count"]
+
+        if self.count:
+            self.matrix = np.memmap(
+                self.matrix_path, dtype=meta["dtype"], mode="r",
+                shape=(self.count, self.dimensions)
+            )
+            self.hashes = np.memmap(self.hashes_path, dtype=HASH_DTYPE, mode="r", shape=(self.count,))
+        else:
+            self.matrix = np.empty((0, self.dimensions), dtype=meta["dtype"])
+            self.hashes = np.empty((0,), dtype=HASH_DTYPE)
+
+        self._rows: Optional[dict[str, int]] = None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __contains__(self, content_hash: str) -> bool:
+        return self.row_of(content_hash) is not None
+
+    def row_of(self, content_hash: str) -> Optional[int]:
+        """Return the matrix row for a content hash (index built on first use)."""
+        if self._rows is None:
+            self._rows = {h.decode(): i for i, h in enumerate(self.hashes.tolist())}
+        return self._rows.get(content_hash)
+
+    def get(self, content_hash: str) -> Optional[np.ndarray]:
+        """Return the vector for a content hash, or None if not exported."""
+        row = self.row_of(content_hash)
+        return None if row is None else self.matrix[row]
+
+    @classmethod
+    def export(
+        cls,
+        cache: "EmbeddingCache",
+        path_prefix: str,
+        model: str = "text-embedding-3-large",
+        dimensions: int = 3072,
+        rebuild: bool = False
+    ) -> "VectorStore":
+        """
+        Export (or incrementally refresh) cached vectors to a vector store.
+
+        Args:
+            cache: Cache to export from
+            path_prefix: Path prefix for the store files
+            model: Model whose vectors to export
+            dimensions: Vector size to export
+            rebuild: Discard any existing store and export from scratch
+
+        Returns:
+            The refreshed VectorStore
+        """
+        matrix_path = Path(f"{path_prefix}.f32")
+        hashes_path = Path(f"{path_prefix}.hashes")
+        meta_path = Path(f"{path_prefix}.meta.json")
+        matrix_path.parent.mkdir(parents=True, exist_ok=True)
+
+        count = 0
+        existing: set[str] = set()
+        if not rebuild and meta_path.exists():
+            store = cls(path_prefix)
+            if store.model == model and store.dimensions == dimensions:
+                count = store.count
+                existing = {h.decode() for h in store.hashes.tolist()}
+            del store
+
+        row_bytes = dimensions * np.dtype(EMBEDDING_DTYPE).itemsize
+        appending = count > 0
+        if appending:
+            # Drop rows appended after the last committed refresh (e.g. a crash)
+            os.truncate(matrix_path, count * row_bytes)
+            os.truncate(hashes_path, count * np.dtype(HASH_DTYPE).itemsize)
+            matrix_target, hashes_target, mode = matrix_path, hashes_path, "r+b"
+        else:
+            # Never truncate files other processes may have memory-mapped
+            matrix_target = matrix_path.with_name(matrix_path.name + ".tmp")
+            hashes_target = hashes_path.with_name(hashes_path.name + ".tmp")
+            mode = "wb"
+
+        with open(matrix_target, mode) as matrix_file, open(hashes_target, mode) as hashes_file:
+            matrix_file.seek(0, os.SEEK_END)
+            hashes_file.seek(0, os.SEEK_END)
+            for content_hash, vector in cache.iter_vectors(model, dimensions, exclude=existing):
+                matrix_file.write(np.asarray(vector, dtype=EMBEDDING_DTYPE).tobytes())
+                hashes_file.write(content_hash.encode())
+                count += 1
+
+        if not appending:
+            os.replace(matrix_target, matrix_path)
+            os.replace(hashes_target, hashes_path)
+
+        # Publish the new row count last so readers never see partial rows
+        tmp_path = meta_path.with_suffix(".json.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "model": model,
+                "dimensions": dimensions,
+                "dtype": EMBEDDING_DTYPE,
+                "count": count
+            }, f, indent=2)
+        os.replace(tmp_path, meta_path)
+
+        return cls(path_prefix)
@@ -6,13 +6,16 @@ Loads content from content_ops CSV and generates embeddings for all pages,
 saving results to JSON for further analysis.
 """
 
+import asyncio
 import csv
 import json
+import os
 import argparse
 from pathlib import Path
 from datetime import datetime
 from typing import Optional
 
+from embeddings.backends import BACKENDS, create_backend
 from embeddings.client import EmbeddingClient
 from embeddings.models import ContentEmbedding, KeywordEmbedding
 
@@ -138,40 +141,116 @@ def extract_keywords_from_content_ops(csv_path: str) -> list[dict]:
     return keywords
 
 
+def embed_texts(
+    client: EmbeddingClient,
+    texts: list[str],
+    show_progress: bool = True,
+    concurrency: int = 1
+):
+    """
+    Embed texts, keeping up to ``concurrency`` API batches in flight.
+
+    Texts that fail to embed come back as None (see ``client.failures``).
+    """
+    if concurrency > 1:
+        return asyncio.run(client.aget_embeddings_batch(
+            texts, show_progress=show_progress, max_concurrency=concurrency,
+            allow_partial=True
+        ))
+    return client.get_embeddings_batch(texts, show_progress=show_progress, allow_partial=True)
+
+
+def content_header(item: dict) -> str:
+    """Title, preceded by the meta description when there is one."""
+    if item.get('meta_description'):
+        return f"{item['meta_description']}\n\n{item['title']}"
+    return item['title']
+
+
+def content_text(item: dict) -> str:
+    """Build the text embedded for a content item."""
+    # Combine title and content for richer embedding
+    text = f"{content_header(item)}\n\n{item['content']}"
+    return text[:8000]  # Truncate very long content
+
+
+def make_content_embedding(
+    item: dict,
+    embedding,
+    max_content_chars: Optional[int] = 5000
+) -> ContentEmbedding:
+    """Pair a content item with its embedding."""
+    return ContentEmbedding(
+        url=item['url'],
+        title=item['title'],
+        content=item['content'][:max_content_chars],  # Store truncated content
+        embedding=embedding,
+        content_type=item.get('content_type', 'page'),
+        meta_description=item.get('meta_description'),
+        h1=item.get('h1'),
+        target_keyword=item.get('target_keyword')
+    )
+
+
+def make_keyword_embedding(kw: dict, embedding) -> KeywordEmbedding:
+    """Pair a keyword row with its embedding."""
+    return KeywordEmbedding(
+        keyword=kw['keyword'],
+        embedding=embedding,
+        search_volume=kw.get('search_volume'),
+        keyword_difficulty=kw.get('keyword_difficulty'),
+        intent=kw.get('intent')
+    )
+
+
 def generate_content_embeddings(
     content_items: list[dict],
     client: EmbeddingClient,
-    show_progress: bool = True
+    show_progress: bool = True,
+    concurrency: int = 1,
+    chunk_long_content: bool = False
 ) -> list[ContentEmbedding]:
-    """Generate embeddings for all content items."""
+    """
+    Generate embeddings for all content items.
+
+    With ``chunk_long_content``, each page body is embedded as paragraph
+    chunks pooled into one vector (plus the title/meta header as a chunk)
+    instead of being cut at 8000 characters. The full body is then stored
+    so the RAG stage can reuse the cached chunk vectors.
+    """
     if show_progress:
         print(f"\nGenerating embeddings for {len(content_items)} content items...")
 
+    if chunk_long_content:
+        bodies = [item['content'] for item in content_items]
+        headers = [content_header(item) for item in content_items]
+        if concurrency > 1:
+            results = asyncio.run(client.aget_document_embeddings(
+                bodies, headers=headers, show_progress=show_progress,
+                max_concurrency=concurrency, allow_partial=True
+            ))
+        else:
+            results = client.get_document_embeddings(
+                bodies, headers=headers, show_progress=show_progress, allow_partial=True
+            )
+        return [
+            make_content_embedding(item, result.embedding, max_content_chars=None)
+            for item, result in zip(content_items, results)
+            if result is not None
+        ]
+
     # Prepare texts for batch embedding
-    texts = []
-    for item in content_items:
-        # Combine title and content for richer embedding
-        text = f"{item['title']}\n\n{item['content']}"
-        if item.get('meta_description'):
-            text = f"{item['meta_description']}\n\n{text}"
-        texts.append(text[:8000])  # Truncate very long content
+    texts = [content_text(item) for item in content_items]
 
     # Get embeddings in batch
-    results = client.get_embeddings_batch(texts, show_progress=show_progress)
+    results = embed_texts(client, texts, show_progress, concurrency)
 
     # Create ContentEmbedding objects
     content_embeddings = []
     for item, result in zip(content_items, results):
-        content_embeddings.append(ContentEmbedding(
-            url=item['url'],
-            title=item['title'],
-            content=item['content'][:5000],  # Store truncated content
-            embedding=result.embedding,
-            content_type=item.get('content_type', 'page'),
-            meta_description=item.get('meta_description'),
-            h1=item.get('h1'),
-            target_keyword=item.get('target_keyword')
-        ))
+        if result is None:
+            continue
+        content_embeddings.append(make_content_embedding(item, result.embedding))
 
     return content_embeddings
 
@@ -179,24 +258,21 @@ def generate_content_embeddings(
 def generate_keyword_embeddings(
     keywords: list[dict],
     client: EmbeddingClient,
-    show_progress: bool = True
+    show_progress: bool = True,
+    concurrency: int = 1
 ) -> list[KeywordEmbedding]:
     """Generate embeddings for all keywords."""
     if show_progress:
         print(f"\nGenerating embeddings for {len(keywords)} keywords...")
 
     texts = [kw['keyword'] for kw in keywords]
-    results = client.get_embeddings_batch(texts, show_progress=show_progress)
+    results = embed_texts(client, texts, show_progress, concurrency)
 
     keyword_embeddings = []
     for kw, result in zip(keywords, results):
-        keyword_embeddings.append(KeywordEmbedding(
-            keyword=kw['keyword'],
-            embedding=result.embedding,
-            search_volume=kw.get('search_volume'),
-            keyword_difficulty=kw.get('keyword_difficulty'),
-            intent=kw.get('intent')
-        ))
+        if result is None:
+            continue
+        keyword_embeddings.append(make_keyword_embedding(kw, result.embedding))
 
     return keyword_embeddings
 
@@ -204,7 +280,9 @@ def generate_keyword_embeddings(
 def save_embeddings(
     content_embeddings: list[ContentEmbedding],
     keyword_embeddings: list[KeywordEmbedding],
-    output_dir: str
+    output_dir: str,
+    model: str = "text-embedding-3-large",
+    dimensions: int = 3072
 ) -> str:
     """Save embeddings to JSON file."""
     output_path = Path(output_dir)
@@ -217,8 +295,8 @@ def save_embeddings(
         "generated_at": datetime.now().isoformat(),
         "content_count": len(content_embeddings),
         "keyword_count": len(keyword_embeddings),
-        "model": "text-embedding-3-large",
-        "dimensions": 3072,
+        "model": model,
+        "dimensions": dimensions,
         "content_embeddings": [ce.to_dict() for ce in content_embeddings],
         "keyword_embeddings": [ke.to_dict() for ke in keyword_embeddings]
     }
@@ -229,6 +307,74 @@ def save_embeddings(
     return str(filename)
 
 
+def _prune_stream(path: Path, committed: dict[str, int]) -> None:
+    """
+    Keep only stream records covered by their section's checkpoint.
+
+    Each record is judged on its own (``index < committed[kind]``), so a
+    section that is re-embedded never drops another section's records; torn
+    or unparseable lines are discarded. The file is replaced atomically.
+    """
+    if not path.exists():
+        return
+
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(path, 'rb') as src, open(tmp_path, 'wb') as dst:
+        for line in src:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record["index"] < committed.get(record["kind"], 0):
+                dst.write(line if line.endswith(b"\n") else line + b"\n")
+    os.replace(tmp_path, path)
+
+
+def stream_embeddings(
+    content_items: list[dict],
+    keyword_items: list[dict],
+    client: EmbeddingClient,
+    output_dir: str
+) -> str:
+    """
+    Stream embeddings to a JSONL file with checkpoint/resume.
+
+    Each line is a ContentEmbedding or KeywordEmbedding dict tagged with
+    ``kind`` and input ``index``. Records are written as batches finish, so
+    memory stays flat; rerunning with the same input resumes after the last
+    committed window instead of starting over.
+    """
+    output_path = Path(output_dir)
+    output_path.mkdir(exist_ok=True)
+    filename = output_path / "embeddings_stream.jsonl"
+
+    sections = [
+        ("content", content_items, [content_text(item) for item in content_items], make_content_embedding),
+        ("keyword", keyword_items, [kw['keyword'] for kw in keyword_items], make_keyword_embedding)
+    ]
+    checkpoints = {
+        kind: str(output_path / f"embeddings_stream.{kind}.checkpoint.json")
+        for kind, _, _, _ in sections
+    }
+    _prune_stream(filename, {
+        kind: client.resume_offset(texts, checkpoints[kind])
+        for kind, _, texts, _ in sections
+    })
+
+    # Line-buffered so every record is on disk before its window is committed
+    with open(filename, 'a', encoding='utf-8', buffering=1) as f:
+        for kind, items, texts, make_embedding in sections:
+            if not items:
+                continue
+            print(f"\nStreaming embeddings for {len(items)} {kind} items...")
+            for index, result in client.get_embeddings_iter(texts, checkpoint_path=checkpoints[kind]):
+                record = {"kind": kind, "index": index}
+                record.update(make_embedding(items[index], result.embedding).to_dict())
+                f.write(json.dumps(record) + "\n")
+
+    return str(filename)
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Generate embeddings for content and keywords"
@@ -253,13 +399,78 @@ def main():
         action="store_true",
         help="Skip embedding cache (re-embed everything)"
     )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="API batches to keep in flight at once (uses the async client when > 1)"
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=float,
+        default=None,
+        help="Evict least recently used cache entries beyond this size (MB)"
+    )
+    parser.add_argument(
+        "--cache-text-storage",
+        choices=["full", "zlib", "zstd", "none"],
+        default="full",
+        help="How the cache stores source text (compressed or dropped to save space)"
+    )
+    parser.add_argument(
+        "--chunk-long-content",
+        action="store_true",
+        help="Embed full pages as pooled paragraph chunks instead of truncating at 8000 chars"
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream embeddings to <output-dir>/embeddings_stream.jsonl with "
+             "checkpoint/resume instead of one JSON file"
+    )
+    parser.add_argument(
+        "--verify-cache-stats",
+        action="store_true",
+        help="Recompute cache statistics with a full table scan"
+    )
+    parser.add_argument(
+        "--export-vectors",
+        action="store_true",
+        help="Refresh the memory-mapped vector store under <output-dir>/vector_store"
+    )
     parser.add_argument(
         "--api-key",
         default=None,
         help="OpenAI API key (or set OPENAI_API_KEY env var)"
     )
+    parser.add_argument(
+        "--backend",
+        choices=sorted(BACKENDS),
+        default="openai",
+        help="Embedding backend ('hashing' and 'local' run offline without an API key)"
+    )
+    parser.add_argument(
+        "--simulated-latency",
+        type=float,
+        default=0.0,
+        help="Seconds of simulated latency per request for the hashing backend"
+    )
+    parser.add_argument(
+        "--local-model",
+        default=None,
+        help="Model directory (ONNX or sentence-transformers) for the local backend"
+    )
+    parser.add_argument(
+        "--metrics-out",
+        default=None,
+        help="Write run metrics to this file (Prometheus text for .prom, JSON otherwise)"
+    )
 
     args = parser.parse_args()
+    if args.backend == "local" and not args.local_model:
+        parser.error("--backend local requires --local-model")
+    if args.stream and args.chunk_long_content:
+        parser.error("--chunk-long-content is not supported with --stream")
 
     # Resolve paths relative to script location
     script_dir = Path(__file__).parent.parent
@@ -274,9 +485,17 @@ def main():
 
     # Initialize client
     try:
+        backend_options = {
+            "openai": {"api_key": args.api_key},
+            "hashing": {"latency": args.simulated_latency},
+            "local": {"model_dir": args.local_model}
+        }[args.backend]
+        backend = create_backend(args.backend, **backend_options)
         client = EmbeddingClient(
-            api_key=args.api_key,
-            use_cache=not args.no_cache
+            backend=backend,
+            use_cache=not args.no_cache,
+            cache_max_size_mb=args.cache_max_mb,
+            cache_text_storage=args.cache_text_storage
         )
     except ValueError as e:
         print(f"Error: {e}")
@@ -299,22 +518,62 @@ def main():
         keyword_items = extract_keywords_from_content_ops(str(content_csv))
         print(f"Extracted {len(keyword_items)} keywords from content ops")
 
-    # Generate embeddings
-    content_embeddings = generate_content_embeddings(content_items, client)
-    keyword_embeddings = generate_keyword_embeddings(keyword_items, client) if keyword_items else []
-
-    # Save results
-    output_file = save_embeddings(content_embeddings, keyword_embeddings, str(output_dir))
+    if args.stream:
+        output_file = stream_embeddings(content_items, keyword_items, client, str(output_dir))
+    else:
+        # Generate embeddings
+        content_embeddings = generate_content_embeddings(
+            content_items, client, concurrency=args.concurrency,
+            chunk_long_content=args.chunk_long_content
+        )
+        keyword_embeddings = generate_keyword_embeddings(
+            keyword_items, client, concurrency=args.concurrency
+        ) if keyword_items else []
+
+        # Save results
+        output_file = save_embeddings(
+            content_embeddings, keyword_embeddings, str(output_dir),
+            model=client.model, dimensions=client.dimensions
+        )
     print(f"\nEmbeddings saved to: {output_file}")
 
+    # Refresh the memory-mapped vector store from the cache
+    if args.export_vectors and client.cache:
+        prefix = output_dir / "vector_store" / f"{client.model}-{client.dimensions}"
+        store = client.cache.export_vectors(str(prefix), client.model, client.dimensions)
+        print(f"Vector store refreshed: {prefix} ({len(store)} vectors)")
+
     # Print usage stats
-    stats = client.get_usage_stats()
+    stats = client.get_usage_stats(verify_cache=args.verify_cache_stats)
     print(f"\nUsage Statistics:")
     print(f"  API calls: {stats['api_calls']}")
     print(f"  Cache hits: {stats['cache_hits']}")
     print(f"  Tokens used: {stats['tokens_used']}")
+    print(f"  Retries: {stats['retries']}")
     print(f"  Estimated cost: {stats['estimated_cost']}")
-
+    if args.verify_cache_stats and "cache_stats" in stats:
+        consistent = stats["cache_stats"]["counters_consistent"]
+        print(f"  Cache counters: {'consistent' if consistent else 'rebuilt from full scan'}")
+
+    performance = stats["performance"]
+    print(f"\nPerformance:")
+    print(f"  Elapsed: {performance['elapsed_seconds']:.1f}s")
+    print(f"  Throughput: {performance['items_per_second']} texts/s, {performance['tokens_per_second']} tokens/s")
+    if performance["requests"]:
+        print(f"  Request latency: p50 {performance['request_p50_seconds']:.3f}s, "
+              f"p95 {performance['request_p95_seconds']:.3f}s over {performance['requests']} requests")
+    print(f"  Rate-limit wait: {performance['rate_limit_wait_seconds']:.1f}s")
+    if args.metrics_out:
+        metrics_path = script_dir / args.metrics_out
+        client.metrics.write(str(metrics_path))
+        print(f"  Metrics written to: {metrics_path}")
+
+    if client.failures:
+        print(f"\nFailed to embed {len(client.failures)} texts (skipped):")
+        for failure in client.failures[:20]:
+            print(f"  [{failure.index}] {failure.text[:60]!r}: {failure.error}")
+
+    client.close()
     return 0
 
 
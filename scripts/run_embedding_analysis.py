@@ -12,6 +12,7 @@ from pathlib import Path
 from datetime import datetime
 from typing import Optional
 
+from embeddings.backends import BACKENDS, create_backend
 from embeddings.client import EmbeddingClient
 from embeddings.models import (
     ContentEmbedding, KeywordEmbedding, AnalysisResult,
@@ -34,12 +35,16 @@ from embeddings.analysis.citations import (
     analyze_citation_readiness, compare_citation_potential
 )
 from embeddings.analysis.rag import (
-    analyze_rag_chunks, analyze_retrieval_coverage, identify_retrieval_gaps
+    analyze_rag_chunks, analyze_retrieval_coverage, identify_retrieval_gaps,
+    chunk_content
 )
 
 
 def load_embeddings(embeddings_path: str) -> tuple[list[ContentEmbedding], list[KeywordEmbedding]]:
-    """Load embeddings from JSON file."""
+    """Load embeddings from a JSON file or a streamed JSONL file."""
+    if embeddings_path.endswith('.jsonl'):
+        return load_embeddings_stream(embeddings_path)
+
     with open(embeddings_path, 'r', encoding='utf-8') as f:
         data = json.load(f)
 
@@ -56,13 +61,34 @@ def load_embeddings(embeddings_path: str) -> tuple[list[ContentEmbedding], list[
     return content_embeddings, keyword_embeddings
 
 
+def load_embeddings_stream(embeddings_path: str) -> tuple[list[ContentEmbedding], list[KeywordEmbedding]]:
+    """Load embeddings streamed by generate_embeddings.py --stream (input order)."""
+    records = {"content": [], "keyword": []}
+    with open(embeddings_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                records[record["kind"]].append(record)
+
+    for kind_records in records.values():
+        kind_records.sort(key=lambda r: r["index"])
+
+    content_embeddings = [ContentEmbedding.from_dict(r) for r in records["content"]]
+    keyword_embeddings = [KeywordEmbedding.from_dict(r) for r in records["keyword"]]
+    return content_embeddings, keyword_embeddings
+
+
 def generate_topic_embeddings(
     client: EmbeddingClient,
     topics: list[str]
 ) -> dict[str, list[float]]:
     """Generate embeddings for a list of topics."""
-    results = client.get_embeddings_batch(topics, show_progress=False)
-    return {topic: result.embedding for topic, result in zip(topics, results)}
+    results = client.get_embeddings_batch(topics, show_progress=False, allow_partial=True)
+    return {
+        topic: result.embedding
+        for topic, result in zip(topics, results)
+        if result is not None
+    }
 
 
 def generate_question_embeddings(
@@ -72,8 +98,12 @@ def generate_question_embeddings(
     """Generate embeddings for questions."""
     if questions is None:
         questions = DEFAULT_ADDICTION_QUESTIONS
-    results = client.get_embeddings_batch(questions, show_progress=False)
-    return {q: result.embedding for q, result in zip(questions, results)}
+    results = client.get_embeddings_batch(questions, show_progress=False, allow_partial=True)
+    return {
+        q: result.embedding
+        for q, result in zip(questions, results)
+        if result is not None
+    }
 
 
 def generate_entity_embeddings(
@@ -86,10 +116,11 @@ def generate_entity_embeddings(
 
     entity_embeddings = {}
     for category, entities in taxonomy.items():
-        results = client.get_embeddings_batch(entities, show_progress=False)
+        results = client.get_embeddings_batch(entities, show_progress=False, allow_partial=True)
         entity_embeddings[category] = {
             entity: result.embedding
             for entity, result in zip(entities, results)
+            if result is not None
         }
 
     return entity_embeddings
@@ -202,20 +233,50 @@ def run_citation_analysis(
     return results
 
 
+def cached_chunk_embeddings(
+    client: Optional[EmbeddingClient],
+    content_text: str
+) -> Optional[list]:
+    """
+    Look up RAG chunk vectors in the cache without calling the API.
+
+    Chunks are cached when pages were embedded with
+    ``generate_embeddings.py --chunk-long-content``.
+
+    Returns:
+        One vector per chunk, or None unless every chunk is cached
+    """
+    if client is None or client.cache is None:
+        return None
+    chunks = chunk_content(content_text)
+    if not chunks:
+        return None
+    cached = client.cache.get_batch(chunks, client.model, client.dimensions)
+    if any(cached[chunk] is None for chunk in chunks):
+        return None
+    return [cached[chunk].embedding for chunk in chunks]
+
+
 def run_rag_analysis(
     content_embeddings: list[ContentEmbedding],
     content_texts: dict[str, str],
-    query_embeddings: dict[str, list[float]]
+    query_embeddings: dict[str, list[float]],
+    client: Optional[EmbeddingClient] = None
 ) -> list[RAGChunkResult]:
-    """Run RAG optimization analysis."""
+    """Run RAG optimization analysis, using cached chunk vectors when available."""
     print("Running RAG chunk analysis...")
 
     results = []
+    chunk_hits = 0
     for content in content_embeddings:
         content_text = content_texts.get(content.url, content.content)
-        result = analyze_rag_chunks(content, content_text, query_embeddings)
+        chunk_embeddings = cached_chunk_embeddings(client, content_text)
+        if chunk_embeddings is not None:
+            chunk_hits += 1
+        result = analyze_rag_chunks(content, content_text, query_embeddings, chunk_embeddings)
         results.append(result)
 
+    print(f"  Pages scored with cached chunk vectors: {chunk_hits}/{len(content_embeddings)}")
     avg_score = sum(r.avg_retrieval_score for r in results) / len(results) if results else 0
     print(f"  Average retrieval score: {avg_score:.2f}")
 
@@ -355,7 +416,7 @@ def main():
     parser.add_argument(
         "--embeddings",
         required=True,
-        help="Path to embeddings JSON file"
+        help="Path to embeddings JSON (or streamed JSONL) file"
     )
     parser.add_argument(
         "--output-dir",
@@ -367,6 +428,23 @@ def main():
         default=None,
         help="OpenAI API key for generating additional embeddings"
     )
+    parser.add_argument(
+        "--backend",
+        choices=sorted(BACKENDS),
+        default="openai",
+        help="Embedding backend for reference embeddings (must match the one "
+             "that produced --embeddings; 'hashing' and 'local' run offline)"
+    )
+    parser.add_argument(
+        "--local-model",
+        default=None,
+        help="Model directory (ONNX or sentence-transformers) for the local backend"
+    )
+    parser.add_argument(
+        "--no-access-tracking",
+        action="store_true",
+        help="Don't record cache hits (read-only analysis runs)"
+    )
     parser.add_argument(
         "--skip-clustering",
         action="store_true",
@@ -397,8 +475,15 @@ def main():
         action="store_true",
         help="Skip RAG analysis"
     )
+    parser.add_argument(
+        "--metrics-out",
+        default=None,
+        help="Write run metrics to this file (Prometheus text for .prom, JSON otherwise)"
+    )
 
     args = parser.parse_args()
+    if args.backend == "local" and not args.local_model:
+        parser.error("--backend local requires --local-model")
 
     # Resolve paths
     script_dir = Path(__file__).parent.parent
@@ -423,7 +508,16 @@ def main():
 
     # Initialize embedding client for generating reference embeddings
     try:
-        client = EmbeddingClient(api_key=args.api_key)
+        backend_options = {
+            "openai": {"api_key": args.api_key},
+            "hashing": {},
+            "local": {"model_dir": args.local_model}
+        }[args.backend]
+        backend = create_backend(args.backend, **backend_options)
+        client = EmbeddingClient(
+            backend=backend,
+            track_cache_access=not args.no_access_tracking
+        )
     except ValueError as e:
         print(f"Warning: {e}")
         print("Some analyses requiring additional embeddings will be limited")
@@ -484,7 +578,7 @@ def main():
         if 'question_embeddings' not in locals():
             question_embeddings = generate_question_embeddings(client)
         result.rag_results = run_rag_analysis(
-            content_embeddings, content_texts, question_embeddings
+            content_embeddings, content_texts, question_embeddings, client
         )
 
     # Generate summary
@@ -512,7 +606,19 @@ def main():
         print(f"\nAPI Usage:")
         print(f"  Calls: {stats['api_calls']}")
         print(f"  Cache hits: {stats['cache_hits']}")
+        if stats['failed_items']:
+            print(f"  Failed items: {stats['failed_items']}")
         print(f"  Estimated cost: {stats['estimated_cost']}")
+        performance = stats['performance']
+        print(f"  Elapsed: {performance['elapsed_seconds']:.1f}s")
+        if performance['requests']:
+            print(f"  Request latency: p50 {performance['request_p50_seconds']:.3f}s, "
+                  f"p95 {performance['request_p95_seconds']:.3f}s over {performance['requests']} requests")
+        if args.metrics_out:
+            metrics_path = script_dir / args.metrics_out
+            client.metrics.write(str(metrics_path))
+            print(f"  Metrics written to: {metrics_path}")
+        client.close()
 
     return 0
 